@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 
+from .database import get_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,11 +45,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'solo_tracker.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'solo_tracker.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -83,15 +87,67 @@ WSGI_APPLICATION = 'solo_leveling.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# Configured from DATABASE_URL / DATABASE_REPLICA_URL, see solo_leveling/database.py
+
+DATABASES = get_databases(BASE_DIR)
+
+DATABASE_ROUTERS = ['solo_tracker.routers.ReplicaRouter']
+
+# New SQLite connections get WAL and the other pragmas in solo_tracker/sqlite.py,
+# e.g. SQLITE_PRAGMAS = {'busy_timeout': 30000} overrides one of them.
 
-DATABASES = {
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. Redis or Memcached) when running several workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'solo-leveling'),
     }
 }
 
 
+# Background jobs
+# The in-process scheduler pre-generates the next day's daily quests shortly
+# before UTC midnight and settles the finished day's streaks shortly after it.
+# Cron running `manage.py assign_daily_quests` and `manage.py update_streaks`
+# does the same jobs when it is left off.
+
+NIGHTLY_SCHEDULER = os.environ.get('NIGHTLY_SCHEDULER', '') == '1'
+NIGHTLY_SCHEDULER_LEAD_MINUTES = 30
+NIGHTLY_SCHEDULER_STREAK_DELAY_MINUTES = 5
+
+# XP ledger
+# Every XP award is recorded as an XPEvent. With XP_LEDGER_DEFERRED on, awards
+# are only recorded and profiles are credited in bulk by
+# `manage.py compact_xp_events`, which must then be scheduled (e.g. every
+# minute from cron); until it runs, pages show the pending XP as projected totals.
+
+XP_LEDGER_DEFERRED = False
+
+# Notification retention, run `manage.py prune_notifications` from cron.
+# Read notifications older than NOTIFICATION_ARCHIVE_AFTER_DAYS move to
+# NotificationArchive; a user's unread notifications past NOTIFICATION_MAX_UNREAD
+# are folded into one digest notification.
+
+NOTIFICATION_ARCHIVE_AFTER_DAYS = 30
+NOTIFICATION_MAX_UNREAD = 50
+
+
+# Request instrumentation
+# Query counts, DB time and latency per URL name for the last
+# QUERY_INSTRUMENTATION_BUFFER requests of each worker, see /api/instrumentation/
+# and `manage.py query_report`. A request running one statement at least
+# N_PLUS_ONE_THRESHOLD times is flagged as a likely N+1.
+
+QUERY_INSTRUMENTATION = True
+QUERY_INSTRUMENTATION_BUFFER = 2000
+N_PLUS_ONE_THRESHOLD = 10
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
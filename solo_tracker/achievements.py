@@ -0,0 +1,68 @@
+from .models import Achievement, UserAchievement, UserQuest
+
+
+# requirement_type -> function(user, profile) returning the user's current value
+_requirement_metrics = {}
+
+
+def requirement(requirement_type):
+    """Register the metric used to evaluate achievements of requirement_type.
+
+    The metric runs at most once per evaluation, however many achievements
+    share the requirement type, so a new rule type costs one query at most.
+    """
+    def decorator(func):
+        _requirement_metrics[requirement_type] = func
+        return func
+    return decorator
+
+
+@requirement('level')
+def level_metric(user, profile):
+    return profile.level
+
+
+@requirement('streak')
+def streak_metric(user, profile):
+    return profile.streak
+
+
+@requirement('quests_completed')
+def quests_completed_metric(user, profile):
+    return UserQuest.objects.filter(user=user, completed=True).count()
+
+
+def check_achievements(user, profile=None):
+    """Award every achievement the user has newly earned.
+
+    Loads the unearned achievements in one query, computes each requirement
+    metric once, creates all new UserAchievement rows with one bulk_create and
+    credits the combined XP bonus with a single add_xp call. Returns the list
+    of achievements awarded.
+    """
+    if profile is None:
+        profile = user.userprofile
+
+    pending = Achievement.objects.exclude(userachievement__user=user)
+    metric_values = {}
+    earned = []
+    for achievement in pending:
+        metric = _requirement_metrics.get(achievement.requirement_type)
+        if metric is None:
+            continue
+        if achievement.requirement_type not in metric_values:
+            metric_values[achievement.requirement_type] = metric(user, profile)
+        if metric_values[achievement.requirement_type] >= achievement.requirement_value:
+            earned.append(achievement)
+
+    if not earned:
+        return []
+
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(user=user, achievement=achievement) for achievement in earned],
+        ignore_conflicts=True,
+    )
+    bonus_xp = sum(achievement.xp_reward for achievement in earned if achievement.xp_reward > 0)
+    if bonus_xp:
+        profile.add_xp(bonus_xp, 'achievement')
+    return earned
@@ -1,5 +1,9 @@
+from collections import Counter
+
 from django.contrib import admin
+from django.db import transaction
 from .models import *
+from .notifications import adjust_unread_counts
 
 # Register your models here.
 
@@ -10,7 +14,37 @@ admin.site.register(UserQuest)
 admin.site.register(Achievement)
 admin.site.register(UserAchievement)
 admin.site.register(CustomQuest)
-admin.site.register(Notification)
+admin.site.register(XPEvent)
+
+
+
+admin.site.register(UserStats)
+admin.site.register(WeeklyProgress)
+admin.site.register(NotificationArchive)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """Keeps UserProfile.unread_count in step with admin edits"""
 
+    def save_model(self, request, obj, form, change):
+        deltas = Counter()
+        if change:
+            old = Notification.objects.filter(pk=obj.pk).values('user_id', 'is_read').first()
+            if old and not old['is_read']:
+                deltas[old['user_id']] -= 1
+        super().save_model(request, obj, form, change)
+        if not obj.is_read:
+            deltas[obj.user_id] += 1
+        adjust_unread_counts(deltas)
 
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        if not obj.is_read:
+            adjust_unread_counts({obj.user_id: -1})
 
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            unread = Counter(queryset.filter(is_read=False).values_list('user_id', flat=True))
+            super().delete_queryset(request, queryset)
+            adjust_unread_counts({user_id: -count for user_id, count in unread.items()})
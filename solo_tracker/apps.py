@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SoloTrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'solo_tracker'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .scheduler import start_scheduler
+
+        start_scheduler()
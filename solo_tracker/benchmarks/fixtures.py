@@ -0,0 +1,124 @@
+import datetime
+import random
+from collections import Counter
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from solo_tracker.daily_quests import assign_daily_quests
+from solo_tracker.models import (
+    CustomQuest, Notification, Quest, QuestCategory, UserProfile, UserQuest, WeeklyProgress,
+)
+from solo_tracker.notifications import adjust_unread_counts
+from solo_tracker.quest_selection import cached_pools
+from solo_tracker.ranking import rebuild_ranks
+from solo_tracker.stats import rebuild_user_stats, week_start
+
+
+CATEGORIES = ['Strength', 'Vitality', 'Agility', 'Intelligence', 'Perception']
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', 'Epic']
+
+
+@dataclass
+class FixtureSummary:
+    users: int = 0
+    quests: int = 0
+    user_quests: int = 0
+    custom_quests: int = 0
+    notifications: int = 0
+
+
+def generate(users=100, quests_per_category=5, history_days=30, completion_rate=0.6,
+             custom_quests_per_user=3, notifications_per_user=10, seed=0, today=None):
+    """Populate an empty database with a realistic hunter population.
+
+    Every user gets a profile with random XP, `history_days` of assigned
+    daily quests up to and including today (about completion_rate of the
+    past ones completed), open custom quests and a mix of read and unread
+    notifications. The stored ranks, UserStats and WeeklyProgress are built
+    from that data, so the fixture looks like a long-running deployment.
+    """
+    rng = random.Random(seed)
+    today = today or timezone.now().date()
+    summary = FixtureSummary()
+
+    categories = [QuestCategory.objects.create(name=name) for name in CATEGORIES]
+    quests = Quest.objects.bulk_create([
+        Quest(
+            title=f'{category.name} quest {index}',
+            description=f'Train your {category.name.lower()}',
+            category=category,
+            difficulty=rng.choice(DIFFICULTIES),
+            xp_reward=rng.choice([50, 100, 150, 200]),
+        )
+        for category in categories
+        for index in range(quests_per_category)
+    ])
+    summary.quests = len(quests)
+
+    password = make_password(None)
+    created = User.objects.bulk_create([
+        User(username=f'hunter{index:05d}', password=password, last_login=timezone.now())
+        for index in range(users)
+    ])
+    user_ids = list(User.objects.filter(username__in=[user.username for user in created]).values_list('id', flat=True))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id, total_xp=rng.randint(0, 50000), streak=rng.randint(0, 30))
+        for user_id in user_ids
+    ])
+    summary.users = len(user_ids)
+
+    cached_pools.cache_clear()
+    for offset in range(history_days - 1, -1, -1):
+        summary.user_quests += assign_daily_quests(today - datetime.timedelta(days=offset)).rows
+
+    past = list(UserQuest.objects.filter(date_assigned__lt=today).values_list('id', 'user_id', 'date_assigned', 'quest__category_id'))
+    completed = [row for row in past if rng.random() < completion_rate]
+    for chunk_start in range(0, len(completed), 500):
+        chunk = completed[chunk_start:chunk_start + 500]
+        UserQuest.objects.filter(id__in=[row[0] for row in chunk]).update(completed=True, completed_at=timezone.now())
+
+    weekly = {}
+    for _, user_id, day, category_id in completed:
+        key = (user_id, week_start(day), category_id)
+        weekly[key] = weekly.get(key, 0) + 1
+    WeeklyProgress.objects.bulk_create(
+        [
+            WeeklyProgress(user_id=user_id, week_start=week, category_id=category_id, completed=count)
+            for (user_id, week, category_id), count in weekly.items()
+        ],
+        batch_size=1000,
+    )
+
+    custom_quests = CustomQuest.objects.bulk_create([
+        CustomQuest(
+            user_id=user_id,
+            title=f'Custom quest {index}',
+            difficulty=rng.choice(DIFFICULTIES),
+            xp_reward=rng.choice([25, 50, 100]),
+            target_count=rng.choice([1, 5, 10, 50]),
+        )
+        for user_id in user_ids
+        for index in range(custom_quests_per_user)
+    ], batch_size=1000)
+    summary.custom_quests = len(custom_quests)
+
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            notification_type=rng.choice(['level_up', 'achievement', 'quest_reminder']),
+            title=f'Notification {index}',
+            message='Keep training, hunter.',
+            is_read=rng.random() < 0.7,
+        )
+        for user_id in user_ids
+        for index in range(notifications_per_user)
+    ], batch_size=1000)
+    summary.notifications = len(notifications)
+    adjust_unread_counts(Counter(notification.user_id for notification in notifications if not notification.is_read))
+
+    rebuild_ranks()
+    rebuild_user_stats()
+    return summary
@@ -0,0 +1,166 @@
+import datetime
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from solo_tracker.instrumentation import QueryCounter
+from solo_tracker.models import CustomQuest, Quest, UserQuest
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+
+    def percentile(self, p):
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100, method='inclusive')[p - 1]
+
+    def summary(self):
+        return {
+            'iterations': len(self.latencies),
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'mean_queries': round(statistics.fmean(self.queries), 2) if self.queries else 0,
+            'max_queries': max(self.queries, default=0),
+        }
+
+
+class Scenario:
+    """One endpoint: prepare() runs unmeasured before every request()"""
+    name = None
+
+    def __init__(self, client, user, rng):
+        self.client = client
+        self.user = user
+        self.rng = rng
+
+    def prepare(self, iteration):
+        pass
+
+    def request(self, iteration):
+        raise NotImplementedError
+
+
+class DashboardScenario(Scenario):
+    name = 'dashboard'
+
+    def request(self, iteration):
+        return self.client.get(reverse('solo_tracker:dashboard'))
+
+
+class LeaderboardScenario(Scenario):
+    name = 'leaderboard'
+
+    def request(self, iteration):
+        return self.client.get(reverse('solo_tracker:leaderboard'))
+
+
+class CompleteQuestScenario(Scenario):
+    name = 'complete_quest'
+
+    def prepare(self, iteration):
+        # A fresh quest every time, dated in the future so it never clashes with the fixture history
+        day = timezone.now().date() + datetime.timedelta(days=iteration + 1)
+        quest = self.rng.choice(list(Quest.objects.values_list('id', flat=True)))
+        self.user_quest = UserQuest.objects.create(user=self.user, quest_id=quest, date_assigned=day)
+
+    def request(self, iteration):
+        return self.client.post(
+            reverse('solo_tracker:complete_quest', args=[self.user_quest.id]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+
+class UpdateQuestProgressScenario(Scenario):
+    name = 'update_quest_progress'
+
+    def prepare(self, iteration):
+        # Every other request completes its quest, the others only count progress
+        self.quest = CustomQuest.objects.create(
+            user=self.user, title=f'Bench quest {iteration}', xp_reward=50, target_count=1 + iteration % 2,
+        )
+
+    def request(self, iteration):
+        return self.client.post(
+            reverse('solo_tracker:update_quest', args=[self.quest.id]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [DashboardScenario, CompleteQuestScenario, UpdateQuestProgressScenario, LeaderboardScenario]
+}
+
+
+def run_scenario(scenario, iterations, warmup=2):
+    """Time `iterations` requests of a scenario and count their queries"""
+    result = ScenarioResult(scenario.name)
+    for iteration in range(warmup + iterations):
+        scenario.prepare(iteration)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = scenario.request(iteration)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{scenario.name} answered {response.status_code}')
+        if iteration >= warmup:
+            result.latencies.append(elapsed)
+            result.queries.append(counter.queries)
+    return result
+
+
+def run_scenarios(names=None, iterations=50, user=None, seed=0):
+    """Run the named scenarios (all by default) as `user`, a random fixture user if None"""
+    rng = random.Random(seed)
+    if user is None:
+        user = rng.choice(list(User.objects.filter(is_active=True).order_by('id')))
+    client = Client()
+    client.force_login(user)
+    return {
+        name: run_scenario(SCENARIOS[name](client, user, rng), iterations).summary()
+        for name in (names or SCENARIOS)
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of `results` against a baseline of the same shape.
+
+    A scenario regresses when it runs more queries than the baseline did or
+    its p95 latency grows by more than `tolerance`. Latency baselines only
+    mean something on the machine that recorded them, query counts anywhere.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['max_queries'] > expected['max_queries']:
+            regressions.append(f'{name}: {result["max_queries"]} queries, baseline {expected["max_queries"]}')
+        if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{name}: p95 {result["p95_ms"]:.2f} ms, baseline {expected["p95_ms"]:.2f} ms')
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline:
+        return json.load(baseline)['scenarios']
+
+
+def save_baseline(path, results, fixture):
+    with open(path, 'w') as baseline:
+        json.dump({'fixture': fixture, 'scenarios': results}, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
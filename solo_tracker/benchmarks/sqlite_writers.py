@@ -0,0 +1,133 @@
+"""
+Concurrent writers on one SQLite file, with Django's defaults and with the
+pragmas solo_tracker.sqlite applies to every connection.
+
+Each worker is a process, like a gunicorn worker, running quest-completion
+sized write transactions (credit XP, record the ledger event) with a few
+leaderboard reads in between:
+
+    python -m solo_tracker.benchmarks.sqlite_writers --workers 8 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from solo_tracker.sqlite import DEFAULT_PRAGMAS, apply_pragmas
+
+
+PROFILES = 1000
+
+# Django opens SQLite connections with the sqlite3 module's 5 second timeout
+# and rollback journal, this is what a deployment ran with before the pragmas.
+MODES = {
+    'defaults': {},
+    'pragmas': DEFAULT_PRAGMAS,
+}
+
+
+def create_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        CREATE TABLE profile (id INTEGER PRIMARY KEY, total_xp INTEGER NOT NULL);
+        CREATE INDEX profile_total_xp ON profile (total_xp);
+        CREATE TABLE xp_event (
+            id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, amount INTEGER NOT NULL, created_at REAL NOT NULL
+        );
+    ''')
+    connection.executemany('INSERT INTO profile (id, total_xp) VALUES (?, 0)', [(i,) for i in range(1, PROFILES + 1)])
+    connection.commit()
+    connection.close()
+
+
+def worker(path, pragmas, seconds, reads_per_write, seed, results):
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    cursor = connection.cursor()
+    apply_pragmas(cursor, pragmas)
+    rng = random.Random(seed)
+    latencies = []
+    reads = errors = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        user_id = rng.randint(1, PROFILES)
+        amount = rng.choice([50, 100, 200])
+        started = time.perf_counter()
+        try:
+            cursor.execute('BEGIN')
+            cursor.execute('UPDATE profile SET total_xp = total_xp + ? WHERE id = ?', (amount, user_id))
+            cursor.execute(
+                'INSERT INTO xp_event (user_id, amount, created_at) VALUES (?, ?, ?)', (user_id, amount, time.time())
+            )
+            cursor.execute('COMMIT')
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            # "database is locked" once the busy timeout runs out
+            errors += 1
+            if connection.in_transaction:
+                cursor.execute('ROLLBACK')
+
+        for _ in range(reads_per_write):
+            try:
+                cursor.execute('SELECT id, total_xp FROM profile ORDER BY total_xp DESC LIMIT 10').fetchall()
+                reads += 1
+            except sqlite3.OperationalError:
+                errors += 1
+
+    connection.close()
+    results.put((latencies, reads, errors))
+
+
+def run(pragmas, workers=4, seconds=5, reads_per_write=4):
+    """Throughput of `workers` processes hammering a fresh database file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        create_database(path)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, pragmas, seconds, reads_per_write, seed, results))
+            for seed in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    latencies = [latency for outcome in outcomes for latency in outcome[0]]
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        'writes_per_second': len(latencies) / seconds,
+        'reads_per_second': sum(outcome[1] for outcome in outcomes) / seconds,
+        'errors': sum(outcome[2] for outcome in outcomes),
+        'p50_ms': percentiles[49] * 1000,
+        'p95_ms': percentiles[94] * 1000,
+        'p99_ms': percentiles[98] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--reads-per-write', type=int, default=4)
+    options = parser.parse_args(argv)
+
+    print(f'{options.workers} worker(s), {options.seconds:g}s per mode')
+    print(f'{"mode":<10} {"writes/s":>10} {"reads/s":>10} {"errors":>7} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for mode, pragmas in MODES.items():
+        result = run(pragmas, options.workers, options.seconds, options.reads_per_write)
+        print(
+            f'{mode:<10} {result["writes_per_second"]:>10.0f} {result["reads_per_second"]:>10.0f} '
+            f'{result["errors"]:>7} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from solo_tracker.dashboard import build_dashboard
+from solo_tracker.instrumentation import QueryCounter
+from solo_tracker.leaderboard import get_snapshot, leaderboard_viewer
+from solo_tracker.models import UserProfile
+
+from .scenarios import ScenarioResult
+
+
+# {% cache %} stores fragments in this alias when it exists, a DummyCache
+# there makes every fragment render as if nothing were cached
+UNCACHED = {
+    **settings.CACHES,
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def dashboard_context(request):
+    return build_dashboard(request.profile).as_dict()
+
+
+def leaderboard_context(request):
+    snapshot = get_snapshot()
+    return {
+        'leaderboard': snapshot['profiles'],
+        'user_profile': request.profile,
+        'leaderboard_version': snapshot['version'],
+        'leaderboard_viewer': leaderboard_viewer(snapshot['profiles'], request.user.id),
+    }
+
+
+PAGES = {
+    'dashboard': ('solo_tracker/dashboard.html', dashboard_context),
+    'leaderboard': ('solo_tracker/leaderboard.html', leaderboard_context),
+}
+
+
+def time_render(template_name, context, request, iterations, warmup=2):
+    """Render a template repeatedly with the same context, timing each render"""
+    result = ScenarioResult(template_name)
+    for iteration in range(warmup + iterations):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            render_to_string(template_name, context, request=request)
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            result.latencies.append(elapsed)
+            result.queries.append(counter.queries)
+    return result
+
+
+def run_render_benchmark(iterations=50, user=None):
+    """Render time of each page with its fragments cached and without.
+
+    The context is built once outside the timing, so this measures only the
+    template render, including the queries a template triggers itself.
+    """
+    if user is None:
+        user = User.objects.filter(is_active=True).order_by('id').first()
+    request = RequestFactory().get('/')
+    request.user = user
+    request.profile = UserProfile.objects.select_related('user').get(user=user)
+
+    results = {}
+    for page, (template_name, build_context) in PAGES.items():
+        context = build_context(request)
+        with override_settings(CACHES=UNCACHED):
+            uncached = time_render(template_name, context, request, iterations).summary()
+        cached = time_render(template_name, context, request, iterations).summary()
+        results[page] = {
+            'uncached': uncached,
+            'cached': cached,
+            'speedup': round(uncached['p50_ms'] / cached['p50_ms'], 2) if cached['p50_ms'] else None,
+        }
+    return results
@@ -0,0 +1,103 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserQuest
+from .quest_selection import get_pools, select_for_users
+from .stats import lock_user_stats, record_assigned
+from .versions import user_data_changed
+
+
+@dataclass
+class AssignmentProgress:
+    users: int = 0
+    rows: int = 0
+    last_user_id: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def build_user_quests(user_ids, day, pools):
+    return [
+        UserQuest(user_id=user_id, quest_id=quest_id, date_assigned=day)
+        for user_id, quest_ids in select_for_users(user_ids, day, pools)
+        for quest_id in quest_ids
+    ]
+
+
+def insert_user_quests(user_ids, day, pools):
+    """Assign `day` to the users in `user_ids` who have no quests for it yet.
+
+    A user's quests are always inserted together, so users with any row for
+    the day are skipped and only the new rows are added to their UserStats.
+    The check runs with the users' UserStats rows locked, so a concurrent
+    run for the same users waits and then skips them instead of having its
+    conflicting rows dropped by the insert yet counted. Returns the
+    inserted rows.
+    """
+    with transaction.atomic():
+        lock_user_stats(user_ids)
+        assigned = set(
+            UserQuest.objects.filter(user_id__in=user_ids, date_assigned=day).values_list('user_id', flat=True)
+        )
+        rows = build_user_quests([user_id for user_id in user_ids if user_id not in assigned], day, pools)
+        UserQuest.objects.bulk_create(rows, ignore_conflicts=True)
+        assigned = Counter(row.user_id for row in rows)
+        record_assigned(assigned)
+        user_data_changed(assigned)
+    return rows
+
+
+def assign_daily_quests(day, chunk_size=1000, start_after=0, active_since=None, progress=None):
+    """Create the daily UserQuest rows of `day` for every active user.
+
+    Each user's quests come from solo_tracker.quest_selection, drawn from
+    category pools built once for the day.
+
+    Users are read as bare ids in chunks seeked on the primary key and their
+    rows inserted with bulk_create(ignore_conflicts=True), so memory stays
+    bounded by chunk_size and re-running a day (or resuming with start_after
+    set to the last reported user id) skips users that already have their
+    quests, with the (user, quest, date_assigned) unique constraint as the
+    backstop against duplicates. active_since limits the
+    job to users who logged in since that datetime. progress, if given, is
+    called with an AssignmentProgress after every chunk.
+    """
+    pools = get_pools(day)
+    result = AssignmentProgress(last_user_id=start_after)
+    if not pools:
+        return result
+
+    users = User.objects.filter(is_active=True)
+    if active_since is not None:
+        users = users.filter(last_login__gte=active_since)
+
+    started = time.monotonic()
+    while True:
+        user_ids = list(
+            users.filter(id__gt=result.last_user_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return result
+
+        rows = insert_user_quests(user_ids, day, pools)
+
+        result.users += len(user_ids)
+        result.rows += len(rows)
+        result.last_user_id = user_ids[-1]
+        result.elapsed = time.monotonic() - started
+        if progress is not None:
+            progress(result)
+
+
+def assign_daily_quests_for_user(user, day=None):
+    """Fallback for a user the nightly job has not covered, e.g. a new signup"""
+    day = day or timezone.now().date()
+    insert_user_quests([user.id], day, get_pools(day))
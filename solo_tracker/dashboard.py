@@ -0,0 +1,88 @@
+import datetime
+from dataclasses import dataclass, fields
+
+from django.utils import timezone
+
+from .daily_quests import assign_daily_quests_for_user
+from .leaderboard import get_snapshot, leaderboard_viewer
+from .models import CustomQuest, UserProfile, UserQuest
+from .stats import get_user_stats, weekly_history
+from .versions import catalog_version
+from .xp import project_pending_xp, xp_ledger_deferred
+
+
+# Completed quests per category in a week that fill its progress bar
+WEEKLY_TARGET = 7
+
+
+@dataclass
+class DashboardContext:
+    profile: UserProfile
+    today_quests: list
+    custom_quests: list
+    leaderboard: list
+    weekly_progress: dict
+    completed_quests_count: int
+    # Keys of the template's cached fragments
+    today: datetime.date
+    user_version: int
+    catalog_version: int
+    leaderboard_version: int
+    leaderboard_viewer: int
+
+    def as_dict(self):
+        # Not dataclasses.asdict, it would deep copy the model instances
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+def build_dashboard(profile, today=None):
+    """Everything the dashboard renders, in five queries on a warm cache.
+
+    Given the request's profile (solo_tracker.middleware): today's quests
+    with their quest and category, the open custom quests, the user's stored
+    stats for the completed count and this week's WeeklyProgress counters.
+    The leaderboard comes from its cached snapshot and the profile's rank is
+    computed from the rank buckets. The user's version stamp keying the
+    template's cached fragments is on the profile, the catalog's is one
+    more small read. Notifications are not part of it, the page loads them
+    over the notification stream.
+    """
+    user = profile.user
+    today = today or timezone.now().date()
+
+    # Include XP still waiting in the ledger, profile is not saved past here
+    if xp_ledger_deferred():
+        project_pending_xp(profile)
+
+    # Normally pre-generated by assign_daily_quests
+    todays_quests = UserQuest.objects.filter(user=user, date_assigned=today).select_related(
+        'quest', 'quest__category'
+    )
+    today_quests = list(todays_quests)
+    # Hunters the nightly job has not covered yet (e.g. new signups)
+    if not today_quests:
+        assign_daily_quests_for_user(user, today)
+        today_quests = list(todays_quests.all())
+
+    custom_quests = list(CustomQuest.objects.filter(user=user, is_completed=False).order_by('-created_at'))
+
+    stats = get_user_stats(user)
+    [(week, weekly)] = weekly_history(user, 1, today)
+    snapshot = get_snapshot()
+    leaderboard = snapshot['profiles'][:10]
+
+    return DashboardContext(
+        profile=profile,
+        today_quests=today_quests,
+        custom_quests=custom_quests,
+        leaderboard=leaderboard,
+        weekly_progress={
+            category: min(count / WEEKLY_TARGET * 100, 100) for category, count in weekly.items()
+        },
+        completed_quests_count=stats.completed_quests,
+        today=today,
+        user_version=profile.data_version,
+        catalog_version=catalog_version(),
+        leaderboard_version=snapshot['version'],
+        leaderboard_viewer=leaderboard_viewer(leaderboard, user.id),
+    )
@@ -0,0 +1,233 @@
+import os
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+# Request latency histogram buckets, upper bounds in ms
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500]
+
+WORKERS_KEY = 'instrumentation:workers'
+WORKER_KEY = 'instrumentation:worker:{}'
+# Worker buffers expire when the worker stops publishing
+WORKER_TIMEOUT = 60 * 10
+PUBLISH_INTERVAL = 10
+
+
+@dataclass
+class RequestSample:
+    view: str
+    duration: float
+    queries: int
+    db_time: float
+    # Most repeated statement and how often it ran, set past the N+1 threshold
+    repeated_sql: str = ''
+    repeated: int = 0
+
+
+class QueryCounter:
+    """execute_wrapper counting the queries of one request and their time"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # The same parameterised SQL over and over is the N+1 signature
+            self.statements[sql] += 1
+
+
+class RequestLog:
+    """Bounded, thread-safe ring buffer of the latest request samples"""
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.published_at = 0.0
+
+    def record(self, sample):
+        with self.lock:
+            self.samples.append(sample)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.samples)
+
+    def publish_due(self):
+        return time.monotonic() - self.published_at >= PUBLISH_INTERVAL
+
+    def publish(self, force=False):
+        """Share this worker's samples through the cache, at most every PUBLISH_INTERVAL.
+
+        Workers whose buffer expired (stopped or restarted processes) are
+        dropped from the registry at the same time.
+        """
+        if not force and not self.publish_due():
+            return
+        self.published_at = time.monotonic()
+        pid = os.getpid()
+        cache.set(WORKER_KEY.format(pid), self.snapshot(), WORKER_TIMEOUT)
+        registered = cache.get(WORKERS_KEY) or set()
+        alive = cache.get_many([WORKER_KEY.format(worker) for worker in registered])
+        workers = {worker for worker in registered if WORKER_KEY.format(worker) in alive} | {pid}
+        if workers != registered:
+            cache.set(WORKERS_KEY, workers, None)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_request_log():
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = RequestLog(getattr(settings, 'QUERY_INSTRUMENTATION_BUFFER', 2000))
+        return _log
+
+
+def collected_samples():
+    """Samples of every worker that published recently, this one's live buffer included"""
+    log = get_request_log()
+    own = WORKER_KEY.format(os.getpid())
+    keys = [WORKER_KEY.format(pid) for pid in cache.get(WORKERS_KEY) or ()]
+    samples = log.snapshot()
+    for key, worker_samples in cache.get_many(keys).items():
+        if key != own:
+            samples.extend(worker_samples)
+    return samples
+
+
+def latency_histogram(durations):
+    histogram = Counter()
+    for duration in durations:
+        ms = duration * 1000
+        bucket = next((f'<{bound}ms' for bound in LATENCY_BUCKETS if ms < bound), f'>={LATENCY_BUCKETS[-1]}ms')
+        histogram[bucket] += 1
+    labels = [f'<{bound}ms' for bound in LATENCY_BUCKETS] + [f'>={LATENCY_BUCKETS[-1]}ms']
+    return {label: histogram[label] for label in labels if histogram[label]}
+
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+def build_report(samples):
+    """Per view name: request count, latency percentiles and histogram, query
+    and DB time figures, and how many requests looked like an N+1"""
+    by_view = {}
+    for sample in samples:
+        by_view.setdefault(sample.view, []).append(sample)
+
+    report = {}
+    for view, view_samples in sorted(by_view.items()):
+        durations = [sample.duration for sample in view_samples]
+        queries = [sample.queries for sample in view_samples]
+        repeated = [sample for sample in view_samples if sample.repeated]
+        report[view] = {
+            'requests': len(view_samples),
+            'p50_ms': round(percentile(durations, 50) * 1000, 2),
+            'p95_ms': round(percentile(durations, 95) * 1000, 2),
+            'latency_histogram': latency_histogram(durations),
+            'mean_queries': round(statistics.fmean(queries), 2),
+            'max_queries': max(queries),
+            'mean_db_ms': round(statistics.fmean(sample.db_time for sample in view_samples) * 1000, 2),
+            'n_plus_one': len(repeated),
+            'n_plus_one_sql': repeated[-1].repeated_sql[:300] if repeated else None,
+        }
+    return report
+
+
+class QueryInstrumentationMiddleware:
+    """Count the queries and DB time of every request without DEBUG.
+
+    Each request gets a QueryCounter installed as execute_wrapper on every
+    connection; the totals are kept per URL name in a bounded ring buffer.
+    Queries of a streamed response body run after the middleware and are
+    not counted. See build_report for the aggregates.
+
+    Works in both sync and async chains, so under ASGI it does not force the
+    async views behind it onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_INSTRUMENTATION', True)
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with self.wrap_connections(counter):
+            response = self.get_response(request)
+        log = self.record(request, counter, time.perf_counter() - started)
+        log.publish()
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        # Connections are per thread and an async view's queries run on the
+        # request's sync_to_async thread, so the wrappers are installed there
+        wrappers = await sync_to_async(self.wrap_connections)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        log = self.record(request, counter, time.perf_counter() - started)
+        if log.publish_due():
+            await sync_to_async(log.publish)()
+        return response
+
+    def wrap_connections(self, counter):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        return stack
+
+    def record(self, request, counter, duration):
+        match = request.resolver_match
+        sample = RequestSample(
+            view=match.view_name if match else '<unresolved>',
+            duration=duration,
+            queries=counter.queries,
+            db_time=counter.db_time,
+        )
+        if counter.statements:
+            sql, repeated = counter.statements.most_common(1)[0]
+            if repeated >= self.threshold:
+                sample.repeated_sql, sample.repeated = sql, repeated
+
+        log = get_request_log()
+        log.record(sample)
+        return log
@@ -0,0 +1,146 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from .models import RankingVersion, UserProfile
+from .ranking import assign_ranks
+from .versions import bump_row_version, row_version
+
+
+# Largest top-N any page shows, every smaller board is a slice of it
+LEADERBOARD_SIZE = 50
+
+SNAPSHOT_KEY = 'leaderboard:snapshot'
+# Last good snapshot, kept without expiry and served while another worker rebuilds
+STALE_SNAPSHOT_KEY = 'leaderboard:snapshot:stale'
+# Small summary of the snapshot checked on every XP change
+BOUNDS_KEY = 'leaderboard:bounds'
+REBUILD_LOCK_KEY = 'leaderboard:rebuild-lock'
+
+SNAPSHOT_TIMEOUT = 300
+REBUILD_LOCK_TIMEOUT = 30
+
+
+def get_leaderboard_cache():
+    return caches[getattr(settings, 'LEADERBOARD_CACHE_ALIAS', 'default')]
+
+
+def build_snapshot():
+    profiles = assign_ranks(
+        list(UserProfile.objects.select_related('user').order_by('-total_xp', 'id')[:LEADERBOARD_SIZE]),
+        at_top=True,
+    )
+    return {
+        'profiles': profiles,
+        # A hunter reaching the cutoff can enter the board, None means it has free places
+        'cutoff': profiles[-1].total_xp if len(profiles) >= LEADERBOARD_SIZE else None,
+        'user_ids': frozenset(profile.user_id for profile in profiles),
+        'version': time.time_ns(),
+    }
+
+
+def store_snapshot(cache, snapshot):
+    cache.set_many({
+        SNAPSHOT_KEY: snapshot,
+        BOUNDS_KEY: {'cutoff': snapshot['cutoff'], 'user_ids': snapshot['user_ids']},
+    }, SNAPSHOT_TIMEOUT)
+    cache.set(STALE_SNAPSHOT_KEY, snapshot, None)
+
+
+def get_snapshot():
+    """Current leaderboard snapshot, rebuilt by a single worker when missing.
+
+    Workers that lose the race for the rebuild lock serve the previous
+    snapshot instead of all querying the profile table at once. Only a cold
+    cache with no previous snapshot falls back to a direct query.
+    """
+    cache = get_leaderboard_cache()
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is not None:
+        return snapshot
+
+    if cache.add(REBUILD_LOCK_KEY, True, REBUILD_LOCK_TIMEOUT):
+        try:
+            snapshot = build_snapshot()
+            store_snapshot(cache, snapshot)
+        finally:
+            cache.delete(REBUILD_LOCK_KEY)
+        return snapshot
+
+    snapshot = cache.get(STALE_SNAPSHOT_KEY)
+    if snapshot is not None:
+        return snapshot
+    return build_snapshot()
+
+
+def get_leaderboard(limit=LEADERBOARD_SIZE):
+    """Top `limit` profiles by total XP, with their users loaded"""
+    return get_snapshot()['profiles'][:limit]
+
+
+def leaderboard_viewer(profiles, user_id):
+    """user_id if that user is on the board, else 0.
+
+    Boards highlight the viewer, so their cached fragments vary on this
+    rather than on every user.
+    """
+    return user_id if any(profile.user_id == user_id for profile in profiles) else 0
+
+
+def ranking_version():
+    """Version of the whole ranking, changes whenever any XP changes.
+
+    Used for ETags of pages outside the snapshot. It is a database row so
+    every worker sees every bump; the bump runs after the XP change commits,
+    as its own short UPDATE, so credits do not queue on the row.
+    """
+    return row_version(RankingVersion)
+
+
+def leaderboard_xp_changed(user_id, total_xp):
+    """Bump the ranking version and drop the cached snapshot if this XP
+    change can alter the top N. Run once the change has committed."""
+    bump_row_version(RankingVersion)
+    cache = get_leaderboard_cache()
+    bounds = cache.get(BOUNDS_KEY)
+    if bounds is not None and bounds['cutoff'] is not None:
+        if total_xp < bounds['cutoff'] and user_id not in bounds['user_ids']:
+            return False
+    cache.delete_many([SNAPSHOT_KEY, BOUNDS_KEY])
+    return True
+
+
+# Hunters are ordered by total XP descending, then by id, and paged with a
+# seek on (total_xp, id) so deep pages never OFFSET or COUNT the table.
+
+def ranked_below(total_xp, profile_id):
+    return Q(total_xp__lt=total_xp) | Q(total_xp=total_xp, id__gt=profile_id)
+
+
+def ranked_above(total_xp, profile_id):
+    return Q(total_xp__gt=total_xp) | Q(total_xp=total_xp, id__lt=profile_id)
+
+
+def page_from_snapshot(after, limit):
+    """Whether leaderboard_page serves this page from the cached snapshot"""
+    return after is None and limit <= LEADERBOARD_SIZE
+
+
+def leaderboard_page(after=None, limit=20):
+    """One page of the ranking after the (total_xp, id) cursor `after`"""
+    if page_from_snapshot(after, limit):
+        return get_leaderboard(limit)
+    profiles = UserProfile.objects.select_related('user').order_by('-total_xp', 'id')
+    if after is not None:
+        profiles = profiles.filter(ranked_below(*after))
+    return assign_ranks(list(profiles[:limit]), at_top=after is None)
+
+
+def leaderboard_around(profile, window=5):
+    """`window` hunters above profile, profile itself and `window` below"""
+    profiles = UserProfile.objects.select_related('user')
+    above = profiles.filter(ranked_above(profile.total_xp, profile.id)).order_by('total_xp', '-id')[:window]
+    below = profiles.filter(ranked_below(profile.total_xp, profile.id)).order_by('-total_xp', 'id')[:window]
+    return assign_ranks([*reversed(above), profile, *below])
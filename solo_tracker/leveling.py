@@ -0,0 +1,136 @@
+from bisect import bisect_right
+from functools import lru_cache
+from math import isqrt
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+DEFAULT_LEVEL_CURVE = {
+    'BACKEND': 'solo_tracker.leveling.LinearCurve',
+    'OPTIONS': {'step': 1000},
+}
+
+# Stats raised on every level up
+STAT_FIELDS = ('strength', 'vitality', 'agility', 'intelligence', 'perception')
+
+
+class LevelCurve:
+    """XP needed per level.
+
+    Subclasses define threshold() and may override cumulative() and
+    level_for() with closed forms; the defaults fall back to a bounded search
+    so any curve still resolves a grant in O(log levels).
+    """
+
+    def __init__(self, stats_per_level=2):
+        self.stats_per_level = stats_per_level
+
+    def threshold(self, level):
+        """XP needed to go from level to level + 1"""
+        raise NotImplementedError
+
+    def cumulative(self, level):
+        """Total XP needed to go from level 1 to level"""
+        return sum(self.threshold(n) for n in range(1, level))
+
+    def level_for(self, total):
+        """Highest level reachable from level 1 with total XP"""
+        low, high = 1, 2
+        while self.cumulative(high) <= total:
+            low, high = high, high * 2
+        # cumulative(low) <= total < cumulative(high)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.cumulative(middle) <= total:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def advance(self, level, current_xp):
+        """Apply current_xp at level, returning (new_level, leftover_xp)"""
+        if current_xp < self.threshold(level):
+            return level, current_xp
+        base = self.cumulative(level)
+        new_level = self.level_for(base + current_xp)
+        return new_level, current_xp - (self.cumulative(new_level) - base)
+
+    def stats_gained(self, levels_gained):
+        return levels_gained * self.stats_per_level
+
+
+class LinearCurve(LevelCurve):
+    """Level n needs step * n XP, the original Solo Tracker curve"""
+
+    def __init__(self, step=1000, **kwargs):
+        super().__init__(**kwargs)
+        self.step = step
+
+    def threshold(self, level):
+        return self.step * level
+
+    def cumulative(self, level):
+        return self.step * level * (level - 1) // 2
+
+    def level_for(self, total):
+        # Largest n with n * (n - 1) / 2 <= total // step
+        steps = total // self.step
+        return (1 + isqrt(1 + 8 * steps)) // 2
+
+
+class QuadraticCurve(LevelCurve):
+    """Level n needs base * n^2 XP"""
+
+    def __init__(self, base=100, **kwargs):
+        super().__init__(**kwargs)
+        self.base = base
+
+    def threshold(self, level):
+        return self.base * level * level
+
+    def cumulative(self, level):
+        return self.base * (level - 1) * level * (2 * level - 1) // 6
+
+
+class TableCurve(LevelCurve):
+    """Thresholds read from a table, the last entry repeats past its end"""
+
+    def __init__(self, thresholds, **kwargs):
+        super().__init__(**kwargs)
+        if not thresholds or any(value <= 0 for value in thresholds):
+            raise ValueError('TableCurve needs a non-empty list of positive thresholds')
+        self.thresholds = list(thresholds)
+        # totals[i] is the XP needed to reach level i + 1
+        self.totals = [0]
+        for value in self.thresholds:
+            self.totals.append(self.totals[-1] + value)
+
+    def threshold(self, level):
+        return self.thresholds[min(level, len(self.thresholds)) - 1]
+
+    def cumulative(self, level):
+        if level <= len(self.totals):
+            return self.totals[level - 1]
+        return self.totals[-1] + (level - len(self.totals)) * self.thresholds[-1]
+
+    def level_for(self, total):
+        if total < self.totals[-1]:
+            return bisect_right(self.totals, total)
+        return len(self.totals) + (total - self.totals[-1]) // self.thresholds[-1]
+
+
+@lru_cache(maxsize=None)
+def get_level_curve():
+    """The curve configured by settings.LEVEL_CURVE"""
+    config = getattr(settings, 'LEVEL_CURVE', DEFAULT_LEVEL_CURVE)
+    curve_class = import_string(config['BACKEND'])
+    return curve_class(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_level_curve(sender, setting, **kwargs):
+    if setting == 'LEVEL_CURVE':
+        get_level_curve.cache_clear()
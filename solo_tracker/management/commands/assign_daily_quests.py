@@ -0,0 +1,64 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from solo_tracker.daily_quests import assign_daily_quests
+
+
+class Command(BaseCommand):
+    help = "Pre-generate the daily UserQuest rows for every active user"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Day to assign, YYYY-MM-DD (defaults to tomorrow, UTC)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of users handled per insert',
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Resume after this user id (the last id reported by an interrupted run)',
+        )
+        parser.add_argument(
+            '--active-within',
+            type=int,
+            help='Only users who logged in within this many days',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+        else:
+            day = timezone.now().date() + datetime.timedelta(days=1)
+
+        active_since = None
+        if options['active_within'] is not None:
+            active_since = timezone.now() - datetime.timedelta(days=options['active_within'])
+
+        def report(progress):
+            self.stdout.write(
+                f'{progress.users} user(s), {progress.rows} row(s), '
+                f'{progress.rows_per_second:.0f} rows/s, last user id {progress.last_user_id}'
+            )
+
+        result = assign_daily_quests(
+            day,
+            chunk_size=options['chunk_size'],
+            start_after=options['start_after'],
+            active_since=active_since,
+            progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Assigned daily quests for {day}: {result.users} user(s), {result.rows} row(s) '
+            f'in {result.elapsed:.1f}s ({result.rows_per_second:.0f} rows/s)'
+        ))
@@ -0,0 +1,104 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from solo_tracker.benchmarks import fixtures
+from solo_tracker.benchmarks.scenarios import SCENARIOS, compare, load_baseline, run_scenarios, save_baseline
+from solo_tracker.benchmarks.templates import run_render_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot endpoints against a generated fixture in a throwaway test database, '
+        'reporting latency percentiles and query counts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of hunters in the fixture')
+        parser.add_argument('--history-days', type=int, default=30, help='Days of daily quest history per hunter')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scenario')
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Scenario to run, may be repeated (defaults to all)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the fixture and scenarios')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the results as a baseline JSON file')
+        parser.add_argument(
+            '--compare',
+            metavar='PATH',
+            help='Compare against a baseline JSON file and fail on regressions',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed p95 latency growth over the baseline with --compare (0.25 is 25%%)',
+        )
+        parser.add_argument(
+            '--render',
+            action='store_true',
+            help='Also time the dashboard and leaderboard template renders with and without fragment caching',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        baseline = load_baseline(options['compare']) if options['compare'] else None
+
+        # Never touch the real database: everything runs in a fresh test database
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            cache.clear()
+            summary = fixtures.generate(
+                users=options['users'], history_days=options['history_days'], seed=options['seed'],
+            )
+            results = run_scenarios(options['scenario'], options['iterations'], seed=options['seed'])
+            render = run_render_benchmark(options['iterations']) if options['render'] else None
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            cache.clear()
+
+        if options['json']:
+            output = results if render is None else {'scenarios': results, 'render': render}
+            self.stdout.write(json.dumps(output, indent=2, sort_keys=True))
+        else:
+            self.stdout.write(
+                f'{summary.users} users, {summary.user_quests} daily quests, '
+                f'{summary.notifications} notifications, {options["iterations"]} requests per scenario'
+            )
+            self.stdout.write(
+                f'{"scenario":<24} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"max":>5}'
+            )
+            for name, result in results.items():
+                self.stdout.write(
+                    f'{name:<24} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                    f'{result["mean_queries"]:>8.1f} {result["max_queries"]:>5}'
+                )
+            if render is not None:
+                self.stdout.write(f'{"template render":<24} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8} {"speedup":>8}')
+                for page, result in render.items():
+                    for mode in ['uncached', 'cached']:
+                        timing = result[mode]
+                        speedup = f'{result["speedup"]:.1f}x' if mode == 'cached' and result['speedup'] else ''
+                        self.stdout.write(
+                            f'{page + " " + mode:<24} {timing["p50_ms"]:>8.2f} {timing["p95_ms"]:>8.2f} '
+                            f'{timing["mean_queries"]:>8.1f} {speedup:>8}'
+                        )
+
+        if options['save_baseline']:
+            fixture = {'users': options['users'], 'history_days': options['history_days'], 'seed': options['seed']}
+            save_baseline(options['save_baseline'], results, fixture)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["save_baseline"]}'))
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
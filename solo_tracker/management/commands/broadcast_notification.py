@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from solo_tracker.models import Notification
+from solo_tracker.notifications import broadcast_notification
+
+
+class Command(BaseCommand):
+    help = 'Send a system notification (e.g. a maintenance warning) to every active user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument(
+            '--type',
+            default='warning',
+            choices=[choice for choice, _ in Notification.NOTIFICATION_TYPES],
+            help='Notification type, defaults to warning',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of users notified per insert',
+        )
+
+    def handle(self, *args, **options):
+        sent = broadcast_notification(
+            options['type'],
+            options['title'],
+            options['message'],
+            chunk_size=options['chunk_size'],
+            progress=lambda total: self.stdout.write(f'Notified {total} user(s)...'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Broadcast sent to {sent} user(s)'))
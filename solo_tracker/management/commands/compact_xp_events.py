@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from solo_tracker.notifications import notify_level_change
+from solo_tracker.xp import compact_xp_events, ledger_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Fold uncompacted XP events into UserProfile totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of events folded per transaction',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='After compacting, check that every profile total matches its ledger',
+        )
+
+    def handle(self, *args, **options):
+        compacted = compact_xp_events(
+            batch_size=options['batch_size'],
+            on_level_change=notify_level_change,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Compacted {compacted} XP event(s)'))
+
+        if options['verify']:
+            mismatches = list(ledger_mismatches())
+            for user_id, ledger_total, profile_total in mismatches[:20]:
+                self.stdout.write(f'User {user_id}: ledger {ledger_total} XP, profile {profile_total} XP')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} profile(s) do not match the XP ledger')
+            self.stdout.write(self.style.SUCCESS('All profile totals match the XP ledger'))
@@ -0,0 +1,60 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from solo_tracker.retention import archive_notifications, coalesce_unread
+
+
+class Command(BaseCommand):
+    help = 'Cap unread notification backlogs and archive old read notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS,
+            help='Archive read notifications older than this many days',
+        )
+        parser.add_argument(
+            '--max-unread',
+            type=int,
+            default=settings.NOTIFICATION_MAX_UNREAD,
+            help='Unread notifications kept per user before older ones are coalesced, 0 to skip',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of notifications archived per transaction',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to go easy on the database',
+        )
+
+    def handle(self, *args, **options):
+        if options['max_unread']:
+            coalesced = coalesce_unread(options['max_unread'])
+            self.stdout.write(f'Coalesced {coalesced} unread notification(s)')
+
+        def report(progress):
+            self.stdout.write(
+                f'{progress.archived} notification(s) archived, '
+                f'{progress.rows_per_second:.0f} rows/s, last id {progress.last_id}'
+            )
+
+        cutoff = timezone.now() - datetime.timedelta(days=options['older_than'])
+        result = archive_notifications(
+            cutoff,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {result.archived} read notification(s) older than {options["older_than"]} day(s) '
+            f'in {result.batches} batch(es)'
+        ))
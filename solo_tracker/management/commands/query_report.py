@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from solo_tracker.instrumentation import build_report, collected_samples
+
+
+SORT_KEYS = {
+    'queries': 'mean_queries',
+    'p95': 'p95_ms',
+    'requests': 'requests',
+    'n_plus_one': 'n_plus_one',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Per-view query counts, DB time and latency recorded by QueryInstrumentationMiddleware. '
+        'Workers share their samples through the cache, so this needs a cache shared with them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='queries',
+            help='Column to sort the views by, highest first',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        report = build_report(collected_samples())
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+            return
+        if not report:
+            self.stdout.write('No requests recorded yet')
+            return
+
+        key = SORT_KEYS[options['sort']]
+        self.stdout.write(
+            f'{"view":<40} {"requests":>8} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8} {"max":>5} {"db ms":>7} {"n+1":>5}'
+        )
+        for view, row in sorted(report.items(), key=lambda item: item[1][key], reverse=True):
+            self.stdout.write(
+                f'{view:<40} {row["requests"]:>8} {row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} '
+                f'{row["mean_queries"]:>8.1f} {row["max_queries"]:>5} {row["mean_db_ms"]:>7.2f} {row["n_plus_one"]:>5}'
+            )
+        for view, row in report.items():
+            if row['n_plus_one_sql']:
+                self.stdout.write(self.style.WARNING(f'Possible N+1 in {view}: {row["n_plus_one_sql"]}'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from solo_tracker.ranking import find_rank_mismatches, rebuild_ranks
+
+
+class Command(BaseCommand):
+    help = 'Recount the rank buckets from total XP, or check the ranks they give against a naive count'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare bucket ranks with the naive COUNT query, do not write anything',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Maximum number of mismatches to report with --check',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = list(find_rank_mismatches(limit=options['limit']))
+            for profile_id, rank, expected_rank in mismatches:
+                self.stdout.write(
+                    f'Profile {profile_id}: rank {rank}, expected {expected_rank}'
+                )
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} rank mismatch(es) found, run rebuild_ranks to fix')
+            self.stdout.write(self.style.SUCCESS('All ranks match'))
+            return
+
+        changed = rebuild_ranks()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ranks, {changed} bucket(s) updated'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from solo_tracker.notifications import rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount every user\'s stored unread notification count from their notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report how many users have a drifted count, do not write anything',
+        )
+
+    def handle(self, *args, **options):
+        fixed = rebuild_unread_counts(dry_run=options['check'])
+        if options['check']:
+            if fixed:
+                raise CommandError(f'{fixed} user(s) with drifted unread counts, run rebuild_unread_counts to fix')
+            self.stdout.write(self.style.SUCCESS('All unread counts match'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt unread counts, {fixed} user(s) updated'))
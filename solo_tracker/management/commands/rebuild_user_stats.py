@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from solo_tracker.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored quest statistics of every user from their quests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report how many users have drifted stats, do not write anything',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of users recomputed per batch',
+        )
+
+    def handle(self, *args, **options):
+        def report(checked, fixed):
+            self.stdout.write(f'{checked} user(s) checked, {fixed} drifted')
+
+        fixed = rebuild_user_stats(chunk_size=options['chunk_size'], dry_run=options['check'], progress=report)
+        if options['check']:
+            if fixed:
+                raise CommandError(f'{fixed} user(s) with drifted stats, run rebuild_user_stats to fix')
+            self.stdout.write(self.style.SUCCESS('All user stats match'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt user stats, {fixed} user(s) updated'))
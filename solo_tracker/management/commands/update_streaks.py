@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from solo_tracker.streaks import update_streaks
+
+
+class Command(BaseCommand):
+    help = "Extend, start or reset every hunter's streak for a finished day"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Day to count, YYYY-MM-DD (defaults to yesterday, UTC)',
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            help='Only reset streaks active within this many days (incremental run)',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+        else:
+            day = timezone.now().date() - datetime.timedelta(days=1)
+
+        extended, reset = update_streaks(day, window=options['window'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated streaks for {day}: {extended} extended or started, {reset} reset'
+        ))
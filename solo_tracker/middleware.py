@@ -0,0 +1,30 @@
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+
+
+def get_profile(request):
+    """The profile of the request's user, loaded at most once per request.
+
+    It is attached to request.user as well, so user.userprofile in views,
+    check_achievements and templates returns the same object without
+    another query. None for anonymous users.
+    """
+    if not hasattr(request, '_cached_profile'):
+        user = request.user
+        profile = None
+        if user.is_authenticated:
+            profile, created = UserProfile.objects.get_or_create(user_id=user.pk)
+            # Reuse the user the auth middleware already loaded instead of joining it again
+            profile.user = user
+            user.userprofile = profile
+        request._cached_profile = profile
+    return request._cached_profile
+
+
+class ProfileMiddleware(MiddlewareMixin):
+    """Set request.profile, a lazy request-scoped UserProfile"""
+
+    def process_request(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def populate_xp_rank(apps, schema_editor):
+    UserProfile = apps.get_model('solo_tracker', 'UserProfile')
+    profiles = list(UserProfile.objects.order_by('-total_xp', 'pk'))
+    rank = 0
+    previous_xp = None
+    for position, profile in enumerate(profiles, start=1):
+        if profile.total_xp != previous_xp:
+            rank = position
+            previous_xp = profile.total_xp
+        profile.xp_rank = rank
+    UserProfile.objects.bulk_update(profiles, ['xp_rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0002_userprofile_agility_userprofile_intelligence_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='xp_rank',
+            field=models.IntegerField(db_index=True, default=1),
+        ),
+        migrations.AlterField(
+            model_name='customquest',
+            name='target_count',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(500)]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='total_xp',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(populate_xp_rank, migrations.RunPython.noop),
+    ]
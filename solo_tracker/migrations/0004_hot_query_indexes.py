@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0003_userprofile_xp_rank'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customquest',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', '-created_at'], name='customquest_user_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-created_at'], name='notification_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userquest',
+            index=models.Index(fields=['user', 'date_assigned'], name='userquest_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userquest',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['user', 'date_assigned'], name='userquest_user_done_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_opening_balances(apps, schema_editor):
+    # XP earned before the ledger existed becomes one compacted event per hunter
+    UserProfile = apps.get_model('solo_tracker', 'UserProfile')
+    XPEvent = apps.get_model('solo_tracker', 'XPEvent')
+    balances = UserProfile.objects.filter(total_xp__gt=0).values_list('user_id', 'total_xp')
+    XPEvent.objects.bulk_create(
+        [
+            XPEvent(user_id=user_id, source_type='opening_balance', amount=total_xp, compacted=True)
+            for user_id, total_xp in balances.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('solo_tracker', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('quest', 'Daily Quest'), ('custom_quest', 'Custom Quest'), ('achievement', 'Achievement'), ('admin', 'Admin Grant'), ('opening_balance', 'Opening Balance')], max_length=20)),
+                ('source_id', models.IntegerField(blank=True, null=True)),
+                ('amount', models.IntegerField()),
+                ('compacted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('compacted', False)), fields=['user', 'id'], name='xpevent_user_pending_idx'), models.Index(condition=models.Q(('compacted', False)), fields=['id'], name='xpevent_pending_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0005_xpevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-total_xp', 'id'], name='userprofile_leaderboard_idx'),
+        ),
+    ]
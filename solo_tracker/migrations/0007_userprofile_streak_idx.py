@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0006_userprofile_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='last_activity',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('streak__gt', 0)), fields=['last_activity'], name='userprofile_streak_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_user_stats(apps, schema_editor):
+    UserQuest = apps.get_model('solo_tracker', 'UserQuest')
+    UserStats = apps.get_model('solo_tracker', 'UserStats')
+    stats = {}
+    rows = UserQuest.objects.values('user_id', 'quest__category__name').annotate(
+        total=models.Count('id'),
+        completed=models.Count('id', filter=models.Q(completed=True)),
+    )
+    for row in rows:
+        user_stats = stats.setdefault(row['user_id'], UserStats(user_id=row['user_id'], category_counts={}))
+        user_stats.total_quests += row['total']
+        user_stats.completed_quests += row['completed']
+        if row['completed']:
+            user_stats.category_counts[row['quest__category__name']] = row['completed']
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('solo_tracker', '0007_userprofile_streak_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_quests', models.IntegerField(default=0)),
+                ('completed_quests', models.IntegerField(default=0)),
+                ('category_counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User stats',
+            },
+        ),
+        migrations.RunPython(populate_user_stats, migrations.RunPython.noop),
+    ]
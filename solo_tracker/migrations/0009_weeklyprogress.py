@@ -0,0 +1,55 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+import datetime
+
+import django.db.models.deletion
+
+
+def populate_weekly_progress(apps, schema_editor):
+    UserQuest = apps.get_model('solo_tracker', 'UserQuest')
+    WeeklyProgress = apps.get_model('solo_tracker', 'WeeklyProgress')
+    counters = {}
+    rows = UserQuest.objects.filter(completed=True).values_list(
+        'user_id', 'date_assigned', 'quest__category_id'
+    ).annotate(count=models.Count('id'))
+    for user_id, day, category_id, count in rows.iterator():
+        key = (user_id, day - datetime.timedelta(days=day.weekday()), category_id)
+        counters[key] = counters.get(key, 0) + count
+    WeeklyProgress.objects.bulk_create(
+        [
+            WeeklyProgress(user_id=user_id, week_start=week_start, category_id=category_id, completed=completed)
+            for (user_id, week_start, category_id), completed in counters.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('solo_tracker', '0008_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('completed', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='solo_tracker.questcategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Weekly progress',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='weeklyprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start', 'category'), name='weeklyprogress_user_week_category'),
+        ),
+        migrations.RunPython(populate_weekly_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('solo_tracker', '0009_weeklyprogress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('level_up', 'Level Up'), ('job_change', 'Job Change'), ('quest_reminder', 'Quest Reminder'), ('achievement', 'Achievement'), ('warning', 'Warning'), ('digest', 'Digest')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(max_length=20)),
+                ('title', models.CharField(max_length=100)),
+                ('message', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at'], name='notificationarchive_user_idx')],
+            },
+        ),
+    ]
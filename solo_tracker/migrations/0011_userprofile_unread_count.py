@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:48
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_counts(apps, schema_editor):
+    Notification = apps.get_model('solo_tracker', 'Notification')
+    UserProfile = apps.get_model('solo_tracker', 'UserProfile')
+    unread = (
+        Notification.objects.filter(user_id=models.OuterRef('user_id'), is_read=False)
+        .order_by()
+        .values('user_id')
+        .annotate(count=models.Count('id'))
+        .values('count')
+    )
+    UserProfile.objects.update(unread_count=Coalesce(models.Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0010_notificationarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_unread_counts, migrations.RunPython.noop),
+    ]
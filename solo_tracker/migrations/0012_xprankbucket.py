@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+def populate_rank_buckets(apps, schema_editor):
+    UserProfile = apps.get_model('solo_tracker', 'UserProfile')
+    XPRankBucket = apps.get_model('solo_tracker', 'XPRankBucket')
+    counts = (
+        UserProfile.objects.annotate(floor=models.F('total_xp') / 1000 * 1000)
+        .values('floor')
+        .annotate(hunters=models.Count('id'))
+        .values_list('floor', 'hunters')
+    )
+    XPRankBucket.objects.bulk_create(
+        [XPRankBucket(floor=floor, hunters=hunters) for floor, hunters in counts], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0011_userprofile_unread_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPRankBucket',
+            fields=[
+                ('floor', models.IntegerField(primary_key=True, serialize=False)),
+                ('hunters', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_rank_buckets, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='xp_rank',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0012_xprankbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='data_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def recompute_last_activity(apps, schema_editor):
+    """last_activity used to be the last dashboard visit, it is now the last
+    day with a completed quest, as update_streaks counts it. Hunters without a
+    completed quest get None and lose the streak the visits gave them."""
+    UserProfile = apps.get_model('solo_tracker', 'UserProfile')
+    UserQuest = apps.get_model('solo_tracker', 'UserQuest')
+    CustomQuest = apps.get_model('solo_tracker', 'CustomQuest')
+
+    # The same days streaks.active_user_ids counts: daily quests by the day
+    # they were assigned, custom quests by the day they were completed
+    daily = (
+        UserQuest.objects.filter(completed=True).order_by()
+        .values('user_id').annotate(last=models.Max('date_assigned'))
+        .values_list('user_id', 'last')
+    )
+    custom = (
+        CustomQuest.objects.filter(is_completed=True, completed_at__isnull=False).order_by()
+        .values('user_id').annotate(last=models.Max('completed_at'))
+        .values_list('user_id', 'last')
+    )
+    last_activity = dict(daily)
+    for user_id, completed_at in custom:
+        day = completed_at.date()
+        if day > last_activity.get(user_id, day.min):
+            last_activity[user_id] = day
+
+    UserProfile.objects.update(last_activity=None)
+    profiles = UserProfile.objects.filter(user_id__in=last_activity).values_list('pk', 'user_id')
+    UserProfile.objects.bulk_update(
+        [UserProfile(pk=pk, last_activity=last_activity[user_id]) for pk, user_id in profiles],
+        ['last_activity'],
+        batch_size=1000,
+    )
+    UserProfile.objects.filter(last_activity__isnull=True).update(streak=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0014_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_last_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo_tracker', '0015_recompute_last_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
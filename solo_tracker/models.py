@@ -1,16 +1,25 @@
-from django.db import models
+from functools import cached_property, partial
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .leveling import get_level_curve
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     level = models.IntegerField(default=1)
     current_xp = models.IntegerField(default=0)
-    total_xp = models.IntegerField(default=0)
+    total_xp = models.IntegerField(default=0, db_index=True)
     streak = models.IntegerField(default=0)
-    last_activity = models.DateField(default=timezone.now)
+    # Last day with a completed quest (None until the first), maintained by solo_tracker.streaks
+    last_activity = models.DateField(null=True, blank=True)
+    # Unread notifications, kept in sync by solo_tracker.notifications
+    unread_count = models.IntegerField(default=0)
+    # Version stamp of the user's notifications, XP and quests, see solo_tracker.versions
+    data_version = models.BigIntegerField(default=0)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
 
         # New stats fields based on Solo Leveling
@@ -24,48 +33,56 @@ class UserProfile(models.Model):
     job_class = models.CharField(max_length=50, default='Hunter')
     job_title = models.CharField(max_length=100, default='E-Rank Hunter')
     
+    class Meta:
+        indexes = [
+            # Leaderboard order and its (total_xp, id) seek pagination
+            models.Index(fields=['-total_xp', 'id'], name='userprofile_leaderboard_idx'),
+            # Streaks the nightly job may have to reset
+            models.Index(fields=['last_activity'], condition=models.Q(streak__gt=0), name='userprofile_streak_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - Level {self.level}"
     
+    @property
+    def level_threshold(self):
+        """XP needed to complete the current level, from the level curve"""
+        return get_level_curve().threshold(self.level)
+    
     @property
     def xp_to_next_level(self):
-        return (self.level * 1000) - self.current_xp
+        return self.level_threshold - self.current_xp
     
     @property
     def xp_percentage(self):
-        return (self.current_xp / (self.level * 1000)) * 100
+        return (self.current_xp / self.level_threshold) * 100
     
-    @property
+    @cached_property
     def rank(self):
-        return UserProfile.objects.filter(total_xp__gt=self.total_xp).count() + 1
-    
-    def add_xp(self, amount):
-        old_level = self.level
-        self.current_xp += amount
-        self.total_xp += amount
-        
-        # Check for level up
-        while self.current_xp >= (self.level * 1000):
-            self.current_xp -= (self.level * 1000)
-            self.level += 1
-
-                        # Increase stats on level up
-            self.strength += 2
-            self.vitality += 2
-            self.agility += 2
-            self.intelligence += 2
-            self.perception += 2
-            
-            # Update job class based on level
-            self.update_job_class()
-        
-        self.save()
-        return {
-            'level_up': self.level > old_level,
-            'old_level': old_level,
-            'new_level': self.level,
-            'stats_gained': (self.level - old_level) * 2 if self.level > old_level else 0
-        }
+        """Leaderboard position, see solo_tracker.ranking.rank_for"""
+        from .ranking import rank_for
+
+        return rank_for(self.total_xp)
+    
+    def forget_rank(self):
+        """Drop the memoized rank so the next read recomputes it from total_xp"""
+        self.__dict__.pop('rank', None)
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .leaderboard import leaderboard_xp_changed
+            from .ranking import count_hunter
+
+            count_hunter(self.total_xp, 1)
+            transaction.on_commit(partial(leaderboard_xp_changed, self.user_id, self.total_xp))
+    
+    def add_xp(self, amount, source_type='admin', source_id=None):
+        """Award XP through the ledger, see solo_tracker.xp.award_xp"""
+        from .xp import award_xp
+
+        return award_xp(self, amount, source_type, source_id)
     
     def update_job_class(self):
         """Update job class based on level"""
@@ -91,6 +108,29 @@ class UserProfile(models.Model):
             self.job_class = 'E-Rank Hunter'
             self.job_title = 'Novice Hunter'
 
+class XPRankBucket(models.Model):
+    """Number of hunters per band of total XP, maintained by solo_tracker.ranking"""
+    # Lowest total XP of the band
+    floor = models.IntegerField(primary_key=True)
+    hunters = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.floor}+ XP: {self.hunters} hunter(s)"
+
+class CatalogVersion(models.Model):
+    """Version stamp of the quest catalog, a single row, see solo_tracker.versions"""
+    version = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+class RankingVersion(models.Model):
+    """Version stamp of the whole XP ranking, a single row, see solo_tracker.leaderboard"""
+    version = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Ranking version {self.version}"
+
 class QuestCategory(models.Model):
     name = models.CharField(max_length=50)
     icon = models.CharField(max_length=50, default='target')
@@ -141,10 +181,69 @@ class UserQuest(models.Model):
     
     class Meta:
         unique_together = ['user', 'quest', 'date_assigned']
+        indexes = [
+            # Today's quests on the dashboard
+            models.Index(fields=['user', 'date_assigned'], name='userquest_user_date_idx'),
+            # Completed counts and weekly progress. Partial indexes because
+            # boolean filters compile to "completed" / NOT "completed" on
+            # SQLite, which a plain composite index cannot seek on.
+            models.Index(
+                fields=['user', 'date_assigned'],
+                condition=models.Q(completed=True),
+                name='userquest_user_done_date_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.quest.title}"
 
+class UserStats(models.Model):
+    """Daily quest totals of a user, kept up to date by solo_tracker.stats"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    total_quests = models.IntegerField(default=0)
+    completed_quests = models.IntegerField(default=0)
+    # Completed quests per category name
+    category_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "User stats"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.completed_quests}/{self.total_quests}"
+
+    @property
+    def completion_rate(self):
+        return (self.completed_quests / self.total_quests * 100) if self.total_quests > 0 else 0
+
+    @property
+    def category_stats(self):
+        """[{'name': ..., 'count': ...}] by most completed first"""
+        return [
+            {'name': name, 'count': count}
+            for name, count in sorted(self.category_counts.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+class WeeklyProgress(models.Model):
+    """Completed daily quests of a user per ISO week and category.
+
+    The week is stored as its Monday, so a run of weeks is a range on the
+    (user, week_start) prefix of the unique index.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    category = models.ForeignKey(QuestCategory, on_delete=models.CASCADE)
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Weekly progress"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start', 'category'], name='weeklyprogress_user_week_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.week_start} - {self.category.name}: {self.completed}"
+
 class Achievement(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
@@ -175,6 +274,7 @@ class Notification(models.Model):
         ('quest_reminder', 'Quest Reminder'),
         ('achievement', 'Achievement'),
         ('warning', 'Warning'),
+        ('digest', 'Digest'),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -188,6 +288,37 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread notifications, newest first
+            models.Index(
+                fields=['user', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notification_user_unread_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
+    
+
+class NotificationArchive(models.Model):
+    """Read notifications moved out of Notification by solo_tracker.retention.
+
+    Rows keep their Notification id, so archiving a batch twice is harmless.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    notification_type = models.CharField(max_length=20)
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notificationarchive_user_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -229,6 +360,16 @@ class CustomQuest(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.title}"
     
+    class Meta:
+        indexes = [
+            # Open custom quests on the dashboard, newest first
+            models.Index(
+                fields=['user', '-created_at'],
+                condition=models.Q(is_completed=False),
+                name='customquest_user_open_idx',
+            ),
+        ]
+    
     @property
     def progress_percentage(self):
         return (self.current_count / self.target_count) * 100 if self.target_count > 0 else 0
@@ -239,3 +380,35 @@ class CustomQuest(models.Model):
             return timezone.now().date() > self.created_at.date()
         return False
 
+
+
+class XPEvent(models.Model):
+    """Append-only record of every XP award.
+
+    Events start uncompacted when XP crediting is deferred and are folded into
+    UserProfile totals by the compact_xp_events command.
+    """
+    SOURCE_TYPES = [
+        ('quest', 'Daily Quest'),
+        ('custom_quest', 'Custom Quest'),
+        ('achievement', 'Achievement'),
+        ('admin', 'Admin Grant'),
+        ('opening_balance', 'Opening Balance'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPES)
+    source_id = models.IntegerField(null=True, blank=True)
+    amount = models.IntegerField()
+    compacted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            # Uncompacted tail, per user and in award order
+            models.Index(fields=['user', 'id'], condition=models.Q(compacted=False), name='xpevent_user_pending_idx'),
+            models.Index(fields=['id'], condition=models.Q(compacted=False), name='xpevent_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} +{self.amount} XP ({self.source_type})"
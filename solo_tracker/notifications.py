@@ -0,0 +1,243 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Notification, UserProfile
+from .pubsub import get_notification_broker
+from .versions import bumped_version
+
+
+_local = threading.local()
+
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'data': notification.data,
+        'created_at': notification.created_at.isoformat()
+    }
+
+
+def pending_notifications(user_id, last_event_id=None, limit=50):
+    """Unread notifications a stream or poll still has to deliver, oldest first.
+
+    Without a last event id this is the latest five unread, like the page load.
+    """
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    if last_event_id is None:
+        notifications = reversed(unread.order_by('-created_at')[:5])
+    else:
+        notifications = unread.filter(id__gt=last_event_id).order_by('id')[:limit]
+    return [serialize_notification(notification) for notification in notifications]
+
+
+def adjust_unread_counts(deltas):
+    """Add to the stored unread counts, deltas is {user_id: change}.
+
+    Call in the transaction that creates or reads the notifications. Most
+    writes change every user by the same amount, so one UPDATE per distinct
+    delta, which also bumps the users' version stamps.
+    """
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            users_by_delta[delta].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(
+            unread_count=F('unread_count') + delta,
+            data_version=bumped_version('data_version'),
+        )
+
+
+def rebuild_unread_counts(dry_run=False):
+    """Recount every stored unread count from the notifications table.
+
+    Repairs counts that drifted, e.g. after notifications were changed with
+    queryset updates. Returns the number of profiles whose count was wrong;
+    with dry_run they are only counted.
+    """
+    unread = (
+        Notification.objects.filter(user_id=OuterRef('user_id'), is_read=False)
+        .order_by()
+        .values('user_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    actual = Coalesce(Subquery(unread), 0)
+    drifted = UserProfile.objects.exclude(unread_count=actual)
+    if dry_run:
+        return drifted.count()
+    return drifted.update(unread_count=actual, data_version=bumped_version('data_version'))
+
+
+def get_unread_count(user_id):
+    """The stored unread count, a single indexed row read"""
+    return UserProfile.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first() or 0
+
+
+def publish_notification(notification):
+    """Push a saved notification to the user's open notification streams"""
+    get_notification_broker().publish(notification.user_id, serialize_notification(notification))
+
+
+def publish_notifications(notifications):
+    broker = get_notification_broker()
+    for notification in notifications:
+        broker.publish(notification.user_id, serialize_notification(notification))
+
+
+class NotificationBatch:
+    def __init__(self, notifications=None):
+        self.notifications = list(notifications or [])
+
+    def flush(self):
+        notifications, self.notifications = self.notifications, []
+        if notifications:
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications)
+                adjust_unread_counts(Counter(notification.user_id for notification in notifications))
+            publish_notifications(notifications)
+        return notifications
+
+
+class collect_notifications(ContextDecorator):
+    """Collect queued notifications and write them with one bulk_create.
+
+    Usable as a decorator or a with block. The batch is written when the
+    block exits, or when the surrounding transaction commits if it is inside
+    one; an exception discards it.
+    """
+
+    def _recreate_cm(self):
+        # A decorated view shares this instance between concurrent requests,
+        # so every call gets its own batch and parent
+        return type(self)()
+
+    def __enter__(self):
+        self.batch = NotificationBatch()
+        self.parent = getattr(_local, 'batch', None)
+        _local.batch = self.batch
+        return self.batch
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.batch = self.parent
+        if exc_type is None:
+            transaction.on_commit(self.batch.flush)
+        return False
+
+
+def queue_notification(user, notification_type, title, message, data=None):
+    """Create a notification, batched if a collect_notifications block is active"""
+    notification = Notification(
+        user=user,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        data=data or {},
+    )
+    batch = getattr(_local, 'batch', None)
+    if batch is None:
+        transaction.on_commit(NotificationBatch([notification]).flush)
+    else:
+        batch.notifications.append(notification)
+    return notification
+
+
+def mark_read(user, ids=None):
+    """Mark the user's unread notifications read with one UPDATE.
+
+    ids limits it to those notifications, otherwise all of them are marked.
+    Returns the number of notifications changed.
+    """
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    with transaction.atomic():
+        updated = unread.update(is_read=True)
+        adjust_unread_counts({user.id: -updated})
+    return updated
+
+
+def broadcast_notification(notification_type, title, message, data=None, chunk_size=1000, progress=None):
+    """Send one notification to every active user in chunks.
+
+    Users are read as bare ids with a seek on the primary key, so memory stays
+    bounded by chunk_size however many users there are. Each chunk is its own
+    transaction. progress, if given, is called with the running total.
+    """
+    sent = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(is_active=True, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return sent
+
+        notifications = [
+            Notification(
+                user_id=user_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                data=data or {},
+            )
+            for user_id in user_ids
+        ]
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+            adjust_unread_counts(dict.fromkeys(user_ids, 1))
+        publish_notifications(notifications)
+
+        sent += len(notifications)
+        last_id = user_ids[-1]
+        if progress is not None:
+            progress(sent)
+
+
+def notify_level_change(user, level_info):
+    """Queue the job change and level up notifications for an XP credit"""
+    if not level_info['level_up']:
+        return []
+
+    notifications = []
+    old_job = level_info['old_job_class']
+    new_job = level_info['new_job_class']
+
+    # Job change notification
+    if old_job != new_job:
+        notifications.append(queue_notification(
+            user,
+            'job_change',
+            'Job Changed!',
+            f'Your job has changed from {old_job} to {new_job}',
+            data={
+                'old_job': old_job,
+                'new_job': new_job,
+                'new_level': level_info['new_level']
+            }
+        ))
+
+    # Level up notification
+    notifications.append(queue_notification(
+        user,
+        'level_up',
+        'Level Up!',
+        f'Congratulations! You reached Level {level_info["new_level"]}!',
+        data={
+            'old_level': level_info['old_level'],
+            'new_level': level_info['new_level'],
+            'stats_gained': level_info['stats_gained']
+        }
+    ))
+    return notifications
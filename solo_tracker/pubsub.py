@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+DEFAULT_NOTIFICATION_BROKER = 'solo_tracker.pubsub.InProcessBroker'
+
+
+class Subscription:
+    """One listener's queue of events, used as an async context manager"""
+
+    def __init__(self, broker, user_id, max_pending=100):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    async def __aenter__(self):
+        self.broker.add_subscription(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.remove_subscription(self)
+
+    async def get(self, timeout):
+        """Next event, or None if nothing arrives within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop. A listener that is this far
+        # behind resyncs from the database on reconnect, so drop the event.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class InProcessBroker:
+    """Per-user fan-out between threads and event loops of one process.
+
+    publish() may be called from any thread, typically a sync view, and hands
+    the event to every subscriber's loop with call_soon_threadsafe. Deployments
+    with several worker processes need a broker backed by a shared service
+    (e.g. Redis pub/sub) implementing the same subscribe/publish interface.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        return Subscription(self, user_id)
+
+    def add_subscription(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.user_id].add(subscription)
+
+    def remove_subscription(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop already closed
+                self.remove_subscription(subscription)
+
+
+@lru_cache(maxsize=None)
+def get_notification_broker():
+    broker_class = import_string(getattr(settings, 'NOTIFICATION_BROKER', DEFAULT_NOTIFICATION_BROKER))
+    return broker_class()
+
+
+@receiver(setting_changed)
+def reset_notification_broker(sender, setting, **kwargs):
+    if setting == 'NOTIFICATION_BROKER':
+        get_notification_broker.cache_clear()
@@ -0,0 +1,74 @@
+import hashlib
+import random
+from functools import lru_cache
+
+from .models import Quest
+from .versions import catalog_version
+
+
+DAILY_QUESTS_PER_USER = 4
+
+# Relative chance of a quest being drawn within its category
+DIFFICULTY_WEIGHTS = {
+    'Easy': 4,
+    'Medium': 3,
+    'Hard': 2,
+    'Epic': 1,
+}
+
+
+def build_pools():
+    """Candidate daily quests per category: {category_id: [(quest_id, weight), ...]}"""
+    pools = {}
+    quests = Quest.objects.filter(is_daily=True, is_active=True).order_by('category_id', 'id')
+    for quest_id, category_id, difficulty in quests.values_list('id', 'category_id', 'difficulty'):
+        pools.setdefault(category_id, []).append((quest_id, DIFFICULTY_WEIGHTS.get(difficulty, 1)))
+    return pools
+
+
+@lru_cache(maxsize=2)
+def cached_pools(day, version):
+    return build_pools()
+
+
+def get_pools(day):
+    """Pools for `day`, built once per process per day and catalog version"""
+    return cached_pools(day, catalog_version())
+
+
+def user_seed(user_id, day):
+    digest = hashlib.sha256(f'{user_id}:{day.isoformat()}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def select_quests(user_id, day, pools, count=DAILY_QUESTS_PER_USER):
+    """The quest ids a user gets on `day`, reproducible from (user_id, day).
+
+    Categories are visited round-robin in a per-user shuffled order so the set
+    stays balanced across categories, and each visit draws one quest weighted
+    by difficulty without replacement.
+    """
+    rng = random.Random(user_seed(user_id, day))
+    remaining = {category_id: list(candidates) for category_id, candidates in pools.items()}
+    categories = sorted(remaining)
+    rng.shuffle(categories)
+
+    selected = []
+    while len(selected) < count and categories:
+        for category_id in list(categories):
+            candidates = remaining[category_id]
+            index = rng.choices(range(len(candidates)), weights=[weight for _, weight in candidates])[0]
+            selected.append(candidates.pop(index)[0])
+            if not candidates:
+                categories.remove(category_id)
+            if len(selected) == count:
+                break
+    return selected
+
+
+def select_for_users(user_ids, day, pools=None, count=DAILY_QUESTS_PER_USER):
+    """Yield (user_id, quest_ids) for a cohort without any per-user query"""
+    if pools is None:
+        pools = get_pools(day)
+    for user_id in user_ids:
+        yield user_id, select_quests(user_id, day, pools, count)
@@ -0,0 +1,120 @@
+from django.db.models import Count, F, Sum
+
+from .models import UserProfile, XPRankBucket
+
+
+# Hunters are ranked by total XP, ties share a rank:
+#   rank = (number of hunters with strictly more XP) + 1
+# Instead of storing every hunter's rank, which an XP change would have to
+# rewrite for everyone it passes, XPRankBucket counts the hunters in each
+# RANK_BUCKET_SIZE wide band of total XP. A rank is then the hunters in the
+# bands above plus an indexed count inside the hunter's own band, and an XP
+# credit touches at most two bucket rows.
+
+RANK_BUCKET_SIZE = 1000
+
+
+def bucket_floor(total_xp):
+    return total_xp // RANK_BUCKET_SIZE * RANK_BUCKET_SIZE
+
+
+def naive_rank(total_xp):
+    """Rank computed the old way, by counting everyone above total_xp"""
+    return UserProfile.objects.filter(total_xp__gt=total_xp).count() + 1
+
+
+def rank_for(total_xp):
+    """Rank of a hunter with total_xp, from the buckets and one band of profiles"""
+    floor = bucket_floor(total_xp)
+    above = XPRankBucket.objects.filter(floor__gt=floor).aggregate(hunters=Sum('hunters'))['hunters'] or 0
+    within = UserProfile.objects.filter(total_xp__gt=total_xp, total_xp__lt=floor + RANK_BUCKET_SIZE).count()
+    return above + within + 1
+
+
+def count_hunter(total_xp, delta):
+    """Add delta hunters to the bucket of total_xp"""
+    floor = bucket_floor(total_xp)
+    if delta > 0:
+        XPRankBucket.objects.bulk_create([XPRankBucket(floor=floor)], ignore_conflicts=True)
+    XPRankBucket.objects.filter(floor=floor).update(hunters=F('hunters') + delta)
+
+
+def move_hunter(old_total, new_total):
+    """Move one hunter between buckets after an XP change.
+
+    Call in the crediting transaction. The two bucket rows are always
+    updated lowest floor first, so concurrent credits lock them in the
+    same order and cannot deadlock; a change within one band writes nothing.
+    """
+    old_floor, new_floor = bucket_floor(old_total), bucket_floor(new_total)
+    if old_floor == new_floor:
+        return
+    for total, delta in sorted([(old_total, -1), (new_total, 1)]):
+        count_hunter(total, delta)
+
+
+def assign_ranks(profiles, at_top=False):
+    """Set .rank on consecutive profiles in leaderboard order in at most three queries.
+
+    Ranks follow from the position on the board, so only the first profile's
+    place is queried (nothing at all with at_top, for a board starting at
+    the first hunter).
+    """
+    if not profiles:
+        return profiles
+    first = profiles[0]
+    above = ties_before = 0
+    if not at_top:
+        above = rank_for(first.total_xp) - 1
+        ties_before = UserProfile.objects.filter(total_xp=first.total_xp, id__lt=first.id).count()
+
+    rank = above + 1
+    for index, profile in enumerate(profiles):
+        if index and profile.total_xp != profiles[index - 1].total_xp:
+            rank = above + ties_before + index + 1
+        profile.rank = rank
+    return profiles
+
+
+def rebuild_ranks():
+    """Recount every bucket from the profile table.
+
+    Returns the number of buckets whose stored count was changed.
+    """
+    counts = dict(
+        UserProfile.objects.annotate(floor=F('total_xp') / RANK_BUCKET_SIZE * RANK_BUCKET_SIZE)
+        .values('floor')
+        .annotate(hunters=Count('id'))
+        .values_list('floor', 'hunters')
+    )
+    stored = dict(XPRankBucket.objects.values_list('floor', 'hunters'))
+    stale = [
+        XPRankBucket(floor=floor, hunters=counts.get(floor, 0))
+        for floor in counts.keys() | stored.keys()
+        if counts.get(floor, 0) != stored.get(floor)
+    ]
+    XPRankBucket.objects.bulk_create(
+        stale, update_conflicts=True, unique_fields=['floor'], update_fields=['hunters'], batch_size=1000,
+    )
+    XPRankBucket.objects.filter(hunters=0).delete()
+    return len(stale)
+
+
+def find_rank_mismatches(limit=None):
+    """Compare ranks from the buckets against the naive COUNT for every profile.
+
+    Yields (profile_id, rank, expected_rank) for each mismatch. This is the
+    slow path on purpose, it is only meant for consistency checks.
+    """
+    found = 0
+    checked = {}
+    profiles = UserProfile.objects.values_list('pk', 'total_xp')
+    for pk, total_xp in profiles.iterator():
+        if total_xp not in checked:
+            checked[total_xp] = (rank_for(total_xp), naive_rank(total_xp))
+        rank, expected = checked[total_xp]
+        if rank != expected:
+            yield pk, rank, expected
+            found += 1
+            if limit is not None and found >= limit:
+                return
@@ -0,0 +1,131 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Notification, NotificationArchive
+from .notifications import adjust_unread_counts
+
+
+@dataclass
+class RetentionProgress:
+    archived: int = 0
+    batches: int = 0
+    last_id: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.archived / self.elapsed if self.elapsed else 0.0
+
+
+def archive_notifications(older_than, batch_size=1000, sleep=0, progress=None):
+    """Move read notifications created before `older_than` to NotificationArchive.
+
+    Notification ids grow with created_at, so the old rows are the id range
+    below the first notification newer than the cutoff. That range is walked
+    in primary key order, one short transaction per batch (copy, then delete
+    by id), so no lock is held for long and an interrupted run just resumes
+    from the start of the range. Unread rows are left alone. sleep (seconds)
+    throttles the job between batches; progress, if given, is called with a
+    RetentionProgress after every batch.
+    """
+    result = RetentionProgress()
+    upper = (
+        Notification.objects.filter(created_at__gte=older_than)
+        .order_by('id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    old = Notification.objects.filter(is_read=True, created_at__lt=older_than)
+    if upper is not None:
+        old = old.filter(id__lt=upper)
+
+    started = time.monotonic()
+    while True:
+        notifications = list(old.filter(id__gt=result.last_id).order_by('id')[:batch_size])
+        if not notifications:
+            return result
+
+        ids = [notification.id for notification in notifications]
+        with transaction.atomic():
+            NotificationArchive.objects.bulk_create(
+                [
+                    NotificationArchive(
+                        id=notification.id,
+                        user_id=notification.user_id,
+                        notification_type=notification.notification_type,
+                        title=notification.title,
+                        message=notification.message,
+                        data=notification.data,
+                        created_at=notification.created_at,
+                    )
+                    for notification in notifications
+                ],
+                ignore_conflicts=True,
+            )
+            Notification.objects.filter(id__in=ids).delete()
+
+        result.archived += len(ids)
+        result.batches += 1
+        result.last_id = ids[-1]
+        result.elapsed = time.monotonic() - started
+        if progress is not None:
+            progress(result)
+        if sleep:
+            time.sleep(sleep)
+
+
+def coalesce_unread(max_unread, progress=None):
+    """Cap every user's unread backlog at max_unread notifications.
+
+    The newest max_unread - 1 stay as they are; the older ones are marked
+    read and replaced by one unread 'digest' notification counting them by
+    type, earlier digests folded in. Returns the number of notifications
+    coalesced; progress, if given, is called with the running total after
+    every user.
+    """
+    keep = max(max_unread - 1, 0)
+    backlogs = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id')
+        .annotate(unread=Count('id'))
+        .filter(unread__gt=max_unread)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+    )
+
+    coalesced = 0
+    for user_id in list(backlogs):
+        unread = Notification.objects.filter(user_id=user_id, is_read=False)
+        older = list(unread.order_by('-created_at', '-id').values_list('id', 'notification_type', 'data')[keep:])
+
+        counts = Counter()
+        for _, notification_type, data in older:
+            if notification_type == 'digest':
+                counts.update(data.get('counts', {}))
+            else:
+                counts[notification_type] += 1
+        total = sum(counts.values())
+        digest = Notification(
+            user_id=user_id,
+            notification_type='digest',
+            title='Notification summary',
+            message=f'{total} older notification(s) were folded into this summary.',
+            data={'counts': dict(counts), 'total': total},
+        )
+
+        with transaction.atomic():
+            # Rows the user read in the meantime are already off the count
+            marked = unread.filter(id__in=[row[0] for row in older]).update(is_read=True)
+            # Saving publishes it on commit, see signals.push_new_notification
+            digest.save()
+            adjust_unread_counts({user_id: 1 - marked})
+
+        coalesced += marked
+        if progress is not None:
+            progress(coalesced)
+    return coalesced
+
@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from solo_leveling.database import REPLICA_ALIAS
+
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def read_replica():
+    """Route the reads made inside the block to the replica, if there is one"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_view(view):
+    """Serve a read-only view from the replica, for sync and async views alike.
+
+    Only views that can live with replication lag belong here; anything that
+    reads what the same request just wrote must stay on the primary.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with read_replica():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with read_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Writes go to the primary, reads inside read_replica() to the replica.
+
+    Reads stay on the primary when no replica is configured or while the
+    primary is in a transaction, so a view never reads around its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and REPLICA_ALIAS in connections.settings
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
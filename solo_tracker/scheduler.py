@@ -0,0 +1,111 @@
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .daily_quests import assign_daily_quests
+from .streaks import update_streaks
+
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+
+def seconds_until(moment):
+    return max((moment - timezone.now()).total_seconds(), 0)
+
+
+def next_run_time(offset):
+    """The next UTC midnight shifted by `offset` (negative runs before it)"""
+    now = timezone.now()
+    midnight = datetime.datetime.combine(now.date(), datetime.time.min, tzinfo=datetime.timezone.utc)
+    run_at = midnight + offset
+    while run_at <= now:
+        run_at += datetime.timedelta(days=1)
+    return run_at
+
+
+def claim(job, day):
+    """Elect a single runner of `job` for `day` across all workers.
+
+    The cache lock only does so when the cache is shared between processes,
+    the jobs themselves are idempotent either way.
+    """
+    return cache.add(f'scheduler:{job}:{day.isoformat()}', True, 60 * 60 * 24)
+
+
+def prepare_day(day):
+    """Pre-generate the daily quests of `day` before it starts"""
+    if not claim('prepared', day):
+        return False
+    result = assign_daily_quests(day)
+    logger.info(
+        'Assigned %s daily quest rows for %s users on %s (%.0f rows/s)',
+        result.rows, result.users, day, result.rows_per_second,
+    )
+    return True
+
+
+def close_day(day):
+    """Settle every streak once `day` is over"""
+    if not claim('closed', day):
+        return False
+    extended, reset = update_streaks(day)
+    logger.info('Streaks for %s: %s extended or started, %s reset', day, extended, reset)
+    return True
+
+
+class NightlyScheduler(threading.Thread):
+    """Daemon thread running the jobs around UTC midnight.
+
+    The next day's quests are generated `lead` before midnight and the
+    finished day's streaks settled `delay` after it.
+    """
+
+    def __init__(self, lead=datetime.timedelta(minutes=30), delay=datetime.timedelta(minutes=5)):
+        super().__init__(name='solo-tracker-scheduler', daemon=True)
+        # (offset from midnight, job, day it runs for relative to that midnight)
+        self.jobs = [
+            (-lead, prepare_day, 0),
+            (delay, close_day, -1),
+        ]
+        self.stopped = threading.Event()
+
+    def next_job(self):
+        runs = []
+        for offset, job, days in self.jobs:
+            run_at = next_run_time(offset)
+            runs.append((run_at, job, (run_at - offset).date() + datetime.timedelta(days=days)))
+        return min(runs, key=lambda run: run[0])
+
+    def run(self):
+        while not self.stopped.is_set():
+            run_at, job, day = self.next_job()
+            if self.stopped.wait(seconds_until(run_at)):
+                return
+            try:
+                job(day)
+            except Exception:
+                logger.exception('Nightly job %s failed', job.__name__)
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_scheduler():
+    """Start the in-process scheduler once, if settings.NIGHTLY_SCHEDULER is on"""
+    global _scheduler
+    if not getattr(settings, 'NIGHTLY_SCHEDULER', False) or _scheduler is not None:
+        return None
+    lead = datetime.timedelta(minutes=getattr(settings, 'NIGHTLY_SCHEDULER_LEAD_MINUTES', 30))
+    delay = datetime.timedelta(minutes=getattr(settings, 'NIGHTLY_SCHEDULER_STREAK_DELAY_MINUTES', 5))
+    _scheduler = NightlyScheduler(lead, delay)
+    _scheduler.start()
+    return _scheduler
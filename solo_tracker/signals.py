@@ -0,0 +1,35 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notification, Quest, QuestCategory, UserProfile
+from .notifications import publish_notification
+from .ranking import count_hunter
+from .sqlite import configure_connection
+from .versions import bump_catalog_version
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(publish_notification, instance))
+
+
+@receiver([post_save, post_delete], sender=Quest)
+@receiver([post_save, post_delete], sender=QuestCategory)
+def quest_catalog_changed(sender, **kwargs):
+    # Cached quest fragments are keyed by the catalog version
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=UserProfile)
+def uncount_deleted_hunter(sender, instance, **kwargs):
+    count_hunter(instance.total_xp, -1)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    configure_connection(connection)
@@ -0,0 +1,37 @@
+from django.conf import settings
+
+
+# Pragmas for a file-backed SQLite database shared by several worker processes.
+#   journal_mode=WAL    readers and the single writer no longer block each other
+#   synchronous=NORMAL  no fsync per commit, only at checkpoints; safe with WAL,
+#                       a power loss can only drop the last commits
+#   busy_timeout        wait this many ms for the write lock instead of failing
+#                       with "database is locked"
+#   mmap_size           read pages through a memory map of this many bytes
+#   cache_size          page cache per connection, negative values are KiB
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,
+}
+
+
+def get_pragmas():
+    """DEFAULT_PRAGMAS updated with settings.SQLITE_PRAGMAS, a None value drops one"""
+    pragmas = {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(connection):
+    """Apply the pragmas to a new Django SQLite connection, other vendors are left alone"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_pragmas())
@@ -0,0 +1,151 @@
+import datetime
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import UserQuest, UserStats, WeeklyProgress
+
+
+# UserStats summarises a user's daily quests so the profile page reads one row
+# instead of counting UserQuest. Assignments add to total_quests and each
+# completion to completed_quests and its category, both in the transaction
+# that writes the UserQuest rows. rebuild_user_stats recomputes it from
+# UserQuest to repair drift.
+#
+# WeeklyProgress rolls completions up per ISO week and category for the
+# dashboard's progress bars and the weekly history API.
+
+
+def get_user_stats(user):
+    stats, created = UserStats.objects.get_or_create(user=user)
+    return stats
+
+
+def lock_user_stats(user_ids):
+    """Create the users' missing UserStats and lock them, in user_id order so
+    concurrent lockers cannot deadlock. Call inside a transaction."""
+    UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+    list(UserStats.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id').values_list('pk'))
+
+
+def record_assigned(counts):
+    """Add newly assigned quests to total_quests, counts is {user_id: quests}"""
+    if not counts:
+        return
+    UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in counts], ignore_conflicts=True)
+
+    # Every user usually gets the same number of quests, so one UPDATE per distinct count
+    users_by_count = defaultdict(list)
+    for user_id, count in counts.items():
+        users_by_count[count].append(user_id)
+    for count, user_ids in users_by_count.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(total_quests=F('total_quests') + count)
+
+
+def record_completion(user_quest):
+    """Count a completed UserQuest, call inside the completing transaction"""
+    category = user_quest.quest.category
+    UserStats.objects.get_or_create(user_id=user_quest.user_id)
+    stats = UserStats.objects.select_for_update().get(user_id=user_quest.user_id)
+    stats.completed_quests += 1
+    stats.category_counts[category.name] = stats.category_counts.get(category.name, 0) + 1
+    stats.save(update_fields=['completed_quests', 'category_counts', 'updated_at'])
+
+    add_weekly_completion(user_quest.user_id, category.id, user_quest.date_assigned)
+    return stats
+
+
+def week_start(day):
+    """Monday of the ISO week containing `day`"""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def add_weekly_completion(user_id, category_id, day):
+    counter = WeeklyProgress.objects.filter(user_id=user_id, week_start=week_start(day), category_id=category_id)
+    if counter.update(completed=F('completed') + 1):
+        return
+    try:
+        with transaction.atomic():
+            WeeklyProgress.objects.create(
+                user_id=user_id, week_start=week_start(day), category_id=category_id, completed=1,
+            )
+    except IntegrityError:
+        # Another completion created the week's counter first
+        counter.update(completed=F('completed') + 1)
+
+
+def weekly_history(user, weeks, today=None):
+    """[(week_start, {category name: completed})] for the last `weeks` ISO
+    weeks up to the current one, oldest first, with empty weeks included"""
+    current = week_start(today or timezone.now().date())
+    first = current - datetime.timedelta(weeks=weeks - 1)
+    history = {first + datetime.timedelta(weeks=index): {} for index in range(weeks)}
+    rows = WeeklyProgress.objects.filter(
+        user=user, week_start__gte=first, week_start__lte=current
+    ).values_list('week_start', 'category__name', 'completed')
+    for week, category, completed in rows:
+        history[week][category] = completed
+    return list(history.items())
+
+
+def compute_user_stats(user_ids):
+    """Fresh UserStats for `user_ids` from their UserQuest rows, one query"""
+    now = timezone.now()
+    stats = {user_id: UserStats(user_id=user_id, category_counts={}, updated_at=now) for user_id in user_ids}
+    rows = UserQuest.objects.filter(user_id__in=user_ids).values('user_id', 'quest__category__name').annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(completed=True)),
+    )
+    for row in rows:
+        user_stats = stats[row['user_id']]
+        user_stats.total_quests += row['total']
+        user_stats.completed_quests += row['completed']
+        if row['completed']:
+            user_stats.category_counts[row['quest__category__name']] = row['completed']
+    return list(stats.values())
+
+
+def stats_differ(stored, fresh):
+    return (
+        stored is None
+        or stored.total_quests != fresh.total_quests
+        or stored.completed_quests != fresh.completed_quests
+        or stored.category_counts != fresh.category_counts
+    )
+
+
+def rebuild_user_stats(chunk_size=1000, dry_run=False, progress=None):
+    """Recompute every user's stats from UserQuest in chunks of users.
+
+    Each chunk is one aggregate query, one read of the stored rows and, for
+    the rows that drifted, one upsert. With dry_run nothing is written.
+    progress, if given, is called with (users checked, rows fixed) after
+    every chunk. Returns the number of rows that were missing or wrong.
+    """
+    checked = fixed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return fixed
+
+        stored = UserStats.objects.in_bulk(user_ids)
+        stale = [fresh for fresh in compute_user_stats(user_ids) if stats_differ(stored.get(fresh.user_id), fresh)]
+        if stale and not dry_run:
+            UserStats.objects.bulk_create(
+                stale,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['total_quests', 'completed_quests', 'category_counts', 'updated_at'],
+            )
+
+        checked += len(user_ids)
+        fixed += len(stale)
+        last_id = user_ids[-1]
+        if progress is not None:
+            progress(checked, fixed)
@@ -0,0 +1,49 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+
+from .models import CustomQuest, UserProfile, UserQuest
+
+
+def active_user_ids(day):
+    """Subqueries of the users who completed a daily or custom quest on `day`"""
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+    daily = UserQuest.objects.filter(date_assigned=day, completed=True).values('user_id')
+    custom = CustomQuest.objects.filter(
+        is_completed=True,
+        completed_at__gte=start,
+        completed_at__lt=start + datetime.timedelta(days=1),
+    ).values('user_id')
+    return Q(user_id__in=daily) | Q(user_id__in=custom)
+
+
+def update_streaks(day, window=None):
+    """Recalculate every streak once `day` is over, with two bulk UPDATEs.
+
+    Hunters active on `day` extend their streak if they were also active the
+    day before and start a new one otherwise; hunters with a streak who were
+    not active on `day` drop to zero. UserProfile.last_activity records the
+    last active day, which also makes re-running a day a no-op.
+
+    With window (days), only streaks active within that window are reset;
+    use it for frequent incremental runs and leave it off for the nightly
+    full pass, which also repairs streaks left over by missed runs.
+    Returns (extended_or_started, reset).
+    """
+    yesterday = day - datetime.timedelta(days=1)
+    with transaction.atomic():
+        not_counted = Q(last_activity__lt=day) | Q(last_activity__isnull=True)
+        extended = UserProfile.objects.filter(active_user_ids(day), not_counted).update(
+            streak=Case(
+                When(last_activity=yesterday, then=F('streak') + 1),
+                default=Value(1),
+            ),
+            last_activity=day,
+        )
+
+        lapsed = UserProfile.objects.filter(streak__gt=0, last_activity__lt=day)
+        if window is not None:
+            lapsed = lapsed.filter(last_activity__gte=day - datetime.timedelta(days=window))
+        reset = lapsed.update(streak=0)
+    return extended, reset
@@ -21,6 +21,12 @@ urlpatterns = [
     path('create-quest/', views.create_custom_quest, name='create_quest'),
     path('update-quest/<int:quest_id>/', views.update_quest_progress, name='update_quest'),
     path('notifications/', views.get_notifications, name='get_notifications'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+    path('notifications/poll/', views.poll_notifications, name='poll_notifications'),
     path('mark-notification-read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('mark-notifications-read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('api/leaderboard/', views.api_leaderboard, name='api_leaderboard'),
+    path('api/weekly-progress/', views.api_weekly_progress, name='api_weekly_progress'),
+    path('api/instrumentation/', views.api_instrumentation, name='api_instrumentation'),
 
 ]
\ No newline at end of file
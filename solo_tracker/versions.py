@@ -0,0 +1,77 @@
+import datetime
+import hashlib
+import time
+
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CatalogVersion, UserProfile
+
+
+# Version stamps live in the database, next to the data they version, so
+# every worker sees the same stamp and a bump commits or rolls back together
+# with its change. A stamp is the time.time_ns() of the last change (or one
+# past the previous stamp if the clock went back), so it also serves as
+# Last-Modified.
+
+# Primary key of the single row of CatalogVersion and RankingVersion
+VERSION_ROW_ID = 1
+
+
+def bumped_version(field):
+    """Expression moving the version column `field` to a new stamp in an UPDATE"""
+    return Greatest(F(field) + 1, Value(time.time_ns(), output_field=BigIntegerField()))
+
+
+def user_version(user_id):
+    """Version stamp of a user's notifications, XP and quests"""
+    return UserProfile.objects.filter(user_id=user_id).values_list('data_version', flat=True).first() or 0
+
+
+def row_version(model):
+    """Stamp of a single-row version model, 0 before its first bump"""
+    return model.objects.filter(pk=VERSION_ROW_ID).values_list('version', flat=True).first() or 0
+
+
+def bump_row_version(model):
+    model.objects.bulk_create([model(pk=VERSION_ROW_ID)], ignore_conflicts=True)
+    model.objects.filter(pk=VERSION_ROW_ID).update(version=bumped_version('version'))
+
+
+def catalog_version():
+    """Version stamp of the quest catalog, the quests and their categories"""
+    return row_version(CatalogVersion)
+
+
+def bump_catalog_version():
+    bump_row_version(CatalogVersion)
+
+
+def user_data_changed(user_ids):
+    """Bump the users' version stamps.
+
+    Call in the transaction that changes the data: the new stamp commits
+    with it, so a request that sees the new stamp also sees the new data and
+    no stale body is ever cached under it.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        UserProfile.objects.filter(user_id__in=user_ids).update(data_version=bumped_version('data_version'))
+
+
+# Per-user GETs also change at midnight (today's quests, the current week),
+# so the day is part of their ETag and the floor of their Last-Modified.
+# Their bodies must come from the primary: a lagging replica could serve old
+# data under the new stamp, which clients would then keep revalidating.
+
+def user_etag(request):
+    """ETag of a per-user GET: the profile's version stamp, the day, path and query"""
+    key = f'{request.profile.data_version}:{timezone.now().date()}:{request.path}:{request.GET.urlencode()}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def user_last_modified(request):
+    changed = datetime.datetime.fromtimestamp(request.profile.data_version / 1e9, tz=datetime.timezone.utc)
+    midnight = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(changed, midnight)
@@ -1,13 +1,39 @@
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.db import transaction
+from django.db.models import F
 from .models import UserProfile, Quest, UserQuest, Achievement, UserAchievement,Notification,CustomQuest
 from .forms import CustomQuestForm
+from .achievements import check_achievements
+from .dashboard import WEEKLY_TARGET, build_dashboard
+from .instrumentation import build_report, collected_samples
+from .leveling import get_level_curve
+from .leaderboard import (
+    get_snapshot, leaderboard_around, leaderboard_page, leaderboard_viewer, page_from_snapshot, ranking_version,
+)
+from .notifications import (
+    collect_notifications, get_unread_count, mark_read, notify_level_change, pending_notifications,
+    queue_notification, serialize_notification,
+)
+from .pubsub import get_notification_broker
+from .routers import replica_view
+from .stats import get_user_stats, record_completion, weekly_history
+from .versions import user_data_changed, user_etag, user_last_modified
+from .xp import award_xp
 
 def home(request):
     # if request.user.is_authenticated:
@@ -35,6 +61,7 @@ def logout_view(request):
     logout(request)
     return redirect('solo_tracker:login') 
 @login_required
+@collect_notifications()
 def create_custom_quest(request):
     if request.method == 'POST':
         form = CustomQuestForm(request.POST)
@@ -51,13 +78,14 @@ def create_custom_quest(request):
             }
             quest.xp_reward = base_xp[quest.difficulty] * quest.target_count
             quest.save()
+            user_data_changed([request.user.id])
             
             # Create notification
-            Notification.objects.create(
-                user=request.user,
-                notification_type='quest_reminder',
-                title='New Quest Created',
-                message=f'Quest "{quest.title}" has been added to your list.',
+            queue_notification(
+                request.user,
+                'quest_reminder',
+                'New Quest Created',
+                f'Quest "{quest.title}" has been added to your list.',
                 data={'quest_id': quest.id}
             )
             
@@ -83,68 +111,46 @@ def create_custom_quest(request):
     return render(request, 'solo_tracker/create_quest.html', {'form': form})
 
 @login_required
+@collect_notifications()
 def update_quest_progress(request, quest_id):
     if request.method == 'POST':
-        quest = get_object_or_404(CustomQuest, id=quest_id, user=request.user)
-        
-        # Increment progress
-        quest.current_count += 1
-        
-        # Check if quest is completed
-        if quest.current_count >= quest.target_count and not quest.is_completed:
-            quest.is_completed = True
-            quest.completed_at = timezone.now()
-            
-            # Add XP to user
-            profile = request.user.userprofile
-            level_info = profile.add_xp(quest.xp_reward)
-            
-            # Create completion notification
-            Notification.objects.create(
-                user=request.user,
-                notification_type='achievement',
-                title='Quest Completed!',
-                message=f'You completed "{quest.title}" and gained {quest.xp_reward} XP!',
-                data={
-                    'quest_id': quest.id,
-                    'xp_gained': quest.xp_reward,
-                    'level_up': level_info['level_up']
-                }
+        with transaction.atomic():
+            # Increment first so concurrent clicks queue on the row lock
+            updated = CustomQuest.objects.filter(id=quest_id, user=request.user).update(
+                current_count=F('current_count') + 1
             )
+            if not updated:
+                raise Http404('No CustomQuest matches the given query.')
+            user_data_changed([request.user.id])
             
-            # Check for level up notification
-            if level_info['level_up']:
-                old_job = UserProfile.objects.get(user=request.user).job_class
-                profile.refresh_from_db()
-                
-                # Job change notification
-                if old_job != profile.job_class:
-                    Notification.objects.create(
-                        user=request.user,
-                        notification_type='job_change',
-                        title='Job Changed!',
-                        message=f'Your job has changed from {old_job} to {profile.job_class}',
-                        data={
-                            'old_job': old_job,
-                            'new_job': profile.job_class,
-                            'new_level': profile.level
-                        }
-                    )
+            # Check if quest is completed, only one request can flip it
+            completed_now = CustomQuest.objects.filter(
+                id=quest_id,
+                is_completed=False,
+                current_count__gte=F('target_count'),
+            ).update(is_completed=True, completed_at=timezone.now())
+            quest = CustomQuest.objects.get(id=quest_id)
+            
+            if completed_now:
+                # Add XP to user
+                profile = request.profile
+                level_info = award_xp(profile, quest.xp_reward, 'custom_quest', quest.id)
                 
-                # Level up notification
-                Notification.objects.create(
-                    user=request.user,
-                    notification_type='level_up',
-                    title='Level Up!',
-                    message=f'Congratulations! You reached Level {profile.level}!',
+                # Create completion notification
+                queue_notification(
+                    request.user,
+                    'achievement',
+                    'Quest Completed!',
+                    f'You completed "{quest.title}" and gained {quest.xp_reward} XP!',
                     data={
-                        'old_level': level_info['old_level'],
-                        'new_level': level_info['new_level'],
-                        'stats_gained': level_info['stats_gained']
+                        'quest_id': quest.id,
+                        'xp_gained': quest.xp_reward,
+                        'level_up': level_info['level_up']
                     }
                 )
-        
-        quest.save()
+                
+                # Level up and job change notifications
+                notify_level_change(request.user, level_info)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
@@ -158,153 +164,194 @@ def update_quest_progress(request, quest_id):
         return redirect('solo_tracker:dashboard')
 
 @login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=user_etag, last_modified_func=user_last_modified)
 def get_notifications(request):
-    notifications = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    )[:5]  # Get latest 5 unread notifications
-    
+    unread_count = request.profile.unread_count
     notification_data = []
-    for notification in notifications:
-        notification_data.append({
-            'id': notification.id,
-            'type': notification.notification_type,
-            'title': notification.title,
-            'message': notification.message,
-            'data': notification.data,
-            'created_at': notification.created_at.isoformat()
-        })
+    if unread_count:
+        notifications = Notification.objects.filter(
+            user=request.user,
+            is_read=False
+        )[:5]  # Get latest 5 unread notifications
+        notification_data = [serialize_notification(notification) for notification in notifications]
     
     return JsonResponse({
         'notifications': notification_data,
-        'count': len(notification_data)
+        'count': unread_count
     })
 
+
+# Seconds between SSE keep-alive comments and before an idle long poll returns
+NOTIFICATION_STREAM_HEARTBEAT = 15
+NOTIFICATION_POLL_TIMEOUT = 25
+# Seconds before a stream is closed; the browser reconnects with Last-Event-ID
+NOTIFICATION_STREAM_MAX_AGE = 300
+
+
+def get_last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def get_authenticated_user_id(request):
+    # request.user hits the session and auth tables, so resolve it off the loop
+    return await sync_to_async(lambda: request.user.id if request.user.is_authenticated else None)()
+
+
+def format_sse(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+async def notification_events(user_id, last_event_id):
+    async with get_notification_broker().subscribe(user_id) as subscription:
+        # Subscribe before reading the backlog so nothing created in between is lost
+        backlog = await sync_to_async(pending_notifications)(user_id, last_event_id)
+        yield 'retry: 5000\n\n'
+        for payload in backlog:
+            last_event_id = payload['id']
+            yield format_sse(payload)
+        
+        deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_AGE
+        while (remaining := deadline - time.monotonic()) > 0:
+            payload = await subscription.get(min(NOTIFICATION_STREAM_HEARTBEAT, remaining))
+            if payload is None:
+                yield ': keep-alive\n\n'
+            elif last_event_id is None or payload['id'] > last_event_id:
+                last_event_id = payload['id']
+                yield format_sse(payload)
+
+
+async def notification_stream(request):
+    """Server-Sent Events stream of the user's new notifications.
+
+    Notifications are pushed from the broker as they are created, an idle
+    stream only sends keep-alive comments and runs no queries. A stream
+    lasts at most NOTIFICATION_STREAM_MAX_AGE seconds.
+
+    Only served under ASGI: a WSGI server buffers a streaming async response
+    whole, so it would never deliver anything and tie up a worker per tab.
+    There the stream answers 204, which makes EventSource give up and the
+    page fall back to the long poll.
+    """
+    user_id = await get_authenticated_user_id(request)
+    if user_id is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    response = StreamingHttpResponse(
+        notification_events(user_id, get_last_event_id(request)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@replica_view
+async def poll_notifications(request):
+    """Long-poll fallback for clients without EventSource.
+
+    Returns the unread notifications after Last-Event-ID at once, or waits on
+    the broker for up to NOTIFICATION_POLL_TIMEOUT seconds for a new one.
+    A user with nothing unread skips the notification scan, and a poll that
+    times out with nothing new answers 204 No Content.
+    """
+    user_id = await get_authenticated_user_id(request)
+    if user_id is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    last_event_id = get_last_event_id(request)
+    async with get_notification_broker().subscribe(user_id) as subscription:
+        notifications = []
+        if await sync_to_async(get_unread_count)(user_id):
+            notifications = await sync_to_async(pending_notifications)(user_id, last_event_id)
+        while not notifications:
+            payload = await subscription.get(NOTIFICATION_POLL_TIMEOUT)
+            if payload is None:
+                break
+            if last_event_id is None or payload['id'] > last_event_id:
+                notifications = [payload]
+    
+    if not notifications:
+        return HttpResponse(status=204)
+    return JsonResponse({'notifications': notifications, 'last_event_id': notifications[-1]['id']})
+
 @login_required
 def mark_notification_read(request, notification_id):
     if request.method == 'POST':
-        notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.save()
+        updated = mark_read(request.user, [notification_id])
+        if not updated and not Notification.objects.filter(id=notification_id, user=request.user).exists():
+            raise Http404('No Notification matches the given query.')
         
         return JsonResponse({'success': True})
     
     return JsonResponse({'success': False})
 
 @login_required
-def dashboard(request):
-    # Get or create user profile
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
-    
-    # Update streak
-    today = timezone.now().date()
-    if profile.last_activity < today:
-        # Check if user completed any quests yesterday
-        yesterday = today - timezone.timedelta(days=1)
-        completed_yesterday = UserQuest.objects.filter(
-            user=request.user,
-            completed=True,
-            date_assigned=yesterday
-        ).exists()
-        
-        if completed_yesterday and profile.last_activity == yesterday:
-            profile.streak += 1
-        elif profile.last_activity < yesterday:
-            profile.streak = 0
-        
-        profile.last_activity = today
-        profile.save()
-    
-    # Get today's quests
-    today_quests = UserQuest.objects.filter(
-        user=request.user,
-        date_assigned=today
-    ).select_related('quest', 'quest__category')
-    
-    # If no quests for today, create them
-    if not today_quests.exists():
-        daily_quests = Quest.objects.filter(is_daily=True, is_active=True)[:4]
-        for quest in daily_quests:
-            UserQuest.objects.create(
-                user=request.user,
-                quest=quest,
-                date_assigned=today
-            )
-        today_quests = UserQuest.objects.filter(
-            user=request.user,
-            date_assigned=today
-        ).select_related('quest', 'quest__category')
-        # Get custom quests
-    custom_quests = CustomQuest.objects.filter(
-        user=request.user,
-        is_completed=False
-    ).order_by('-created_at')
-    
-    # Get leaderboard
-    leaderboard = UserProfile.objects.select_related('user').order_by('-total_xp')[:10]
-    
-    # Get weekly progress
-    week_start = today - timezone.timedelta(days=today.weekday())
-    weekly_stats = UserQuest.objects.filter(
-        user=request.user,
-        completed=True,
-        date_assigned__gte=week_start
-    ).values('quest__category__name').annotate(
-        count=Count('id')
-    )
+@require_POST
+def mark_notifications_read(request):
+    """Mark several notifications read in one UPDATE.
+
+    Takes ids=1&ids=2 (or a JSON body {"ids": [...]}) for specific
+    notifications and marks every unread notification when none are given.
+    """
+    if request.content_type == 'application/json':
+        try:
+            ids = json.loads(request.body or '{}').get('ids')
+        except (ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    else:
+        ids = request.POST.getlist('ids') or None
     
-    # Calculate weekly progress percentages
-    weekly_progress = {}
-    for stat in weekly_stats:
-        category = stat['quest__category__name']
-        count = stat['count']
-        # Assuming 7 quests per week per category as target
-        percentage = min((count / 7) * 100, 100)
-        weekly_progress[category] = percentage
-
-        # Get recent notifications
-    notifications = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    )[:3]
-    
-    context = {
-        'profile': profile,
-        'today_quests': today_quests,
-        'custom_quests': custom_quests,
-        'notifications': notifications,
-        'leaderboard': leaderboard,
-        'weekly_progress': weekly_progress,
-        'completed_quests_count': UserQuest.objects.filter(user=request.user, completed=True).count(),
-    }
+    try:
+        ids = [int(notification_id) for notification_id in ids] if ids is not None else None
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'ids must be notification ids'}, status=400)
     
+    updated = mark_read(request.user, ids)
+    return JsonResponse({'success': True, 'updated': updated})
+
+@login_required
+def dashboard(request):
+    context = build_dashboard(request.profile).as_dict()
     return render(request, 'solo_tracker/dashboard.html', context)
 
 @login_required
 def complete_quest(request, quest_id):
     if request.method == 'POST':
         user_quest = get_object_or_404(
-            UserQuest, 
+            UserQuest.objects.select_related('quest', 'quest__category'),
             id=quest_id, 
             user=request.user, 
             completed=False
         )
         
-        # Mark quest as completed
-        user_quest.completed = True
-        user_quest.completed_at = timezone.now()
-        user_quest.save()
-        
-        # Add XP to user
-        profile = request.user.userprofile
-        old_level = profile.level
-        new_level = profile.add_xp(user_quest.quest.xp_reward)
-        
-        # Check for level up
-        level_up = new_level > old_level
+        with transaction.atomic():
+            # Mark quest as completed, a repeated click finds nothing to update
+            completed_now = UserQuest.objects.filter(id=user_quest.id, completed=False).update(
+                completed=True,
+                completed_at=timezone.now()
+            )
+            if not completed_now:
+                raise Http404('No UserQuest matches the given query.')
+            
+            # Add XP to user
+            profile = request.profile
+            level_info = award_xp(profile, user_quest.quest.xp_reward, 'quest', user_quest.id)
+            record_completion(user_quest)
+            
+            # Check for achievements
+            check_achievements(request.user, profile)
         
-        # Check for achievements
-        check_achievements(request.user)
+        level_up = level_info['level_up']
+        # From the award, which includes XP still waiting in a deferred ledger
+        new_level = level_info['new_level']
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
@@ -312,8 +359,9 @@ def complete_quest(request, quest_id):
                 'level_up': level_up,
                 'new_level': new_level,
                 'xp_gained': user_quest.quest.xp_reward,
-                'current_xp': profile.current_xp,
-                'total_xp': profile.total_xp,
+                'current_xp': level_info['current_xp'],
+                'total_xp': level_info['total_xp'],
+                'level_threshold': get_level_curve().threshold(new_level),
             })
         
         if level_up:
@@ -325,66 +373,140 @@ def complete_quest(request, quest_id):
     
     return redirect('solo_tracker:dashboard')
 
-def check_achievements(user):
-    profile = user.userprofile
-    achievements = Achievement.objects.all()
-    
-    for achievement in achievements:
-        # Skip if user already has this achievement
-        if UserAchievement.objects.filter(user=user, achievement=achievement).exists():
-            continue
-        
-        earned = False
-        
-        if achievement.requirement_type == 'level':
-            earned = profile.level >= achievement.requirement_value
-        elif achievement.requirement_type == 'streak':
-            earned = profile.streak >= achievement.requirement_value
-        elif achievement.requirement_type == 'quests_completed':
-            completed_count = UserQuest.objects.filter(user=user, completed=True).count()
-            earned = completed_count >= achievement.requirement_value
-        
-        if earned:
-            UserAchievement.objects.create(user=user, achievement=achievement)
-            if achievement.xp_reward > 0:
-                profile.add_xp(achievement.xp_reward)
-
 @login_required
+@replica_view
 def leaderboard(request):
-    leaderboard = UserProfile.objects.select_related('user').order_by('-total_xp')[:50]
+    snapshot = get_snapshot()
+    leaderboard = snapshot['profiles']
     context = {
         'leaderboard': leaderboard,
-        'user_profile': request.user.userprofile,
+        'user_profile': request.profile,
+        'leaderboard_version': snapshot['version'],
+        'leaderboard_viewer': leaderboard_viewer(leaderboard, request.user.id),
     }
     return render(request, 'solo_tracker/leaderboard.html', context)
 
+def leaderboard_params(request):
+    """(limit, window, after) of an api_leaderboard request, ValueError if invalid"""
+    limit = min(int(request.GET.get('limit', 20)), 100)
+    window = min(int(request.GET.get('window', 5)), 50)
+    after = request.GET.get('after')
+    if after:
+        total_xp, profile_id = after.split(':')
+        after = (int(total_xp), int(profile_id))
+    if limit < 1 or window < 0:
+        raise ValueError('limit must be positive and window not negative')
+    return limit, window, after or None
+
+
+def leaderboard_etag(request):
+    # First pages are read from the snapshot and only change with it. Deeper
+    # pages and around=me follow the ranking version, which every XP change
+    # bumps. is_current_user makes both per user.
+    try:
+        limit, window, after = leaderboard_params(request)
+        from_snapshot = request.GET.get('around') != 'me' and page_from_snapshot(after, limit)
+    except ValueError:
+        from_snapshot = False
+    version = f"snapshot:{get_snapshot()['version']}" if from_snapshot else ranking_version()
+    key = f'{version}:{request.user.id}:{request.GET.urlencode()}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def leaderboard_entry(profile, user):
+    return {
+        'id': profile.id,
+        'rank': profile.rank,
+        'username': profile.user.username,
+        'level': profile.level,
+        'total_xp': profile.total_xp,
+        'job_class': profile.job_class,
+        'is_current_user': profile.user_id == user.id,
+    }
+
+
+def stream_leaderboard(entries, next_cursor):
+    yield '{"results": ['
+    for index, entry in enumerate(entries):
+        yield (',' if index else '') + json.dumps(entry)
+    yield '], "next": ' + json.dumps(next_cursor) + '}'
+
+
+@login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=leaderboard_etag)
+@replica_view
+def api_leaderboard(request):
+    """Leaderboard JSON, paged with ?after=<total_xp>:<id>&limit=N or
+    centred on the current hunter with ?around=me&window=N"""
+    try:
+        limit, window, after = leaderboard_params(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit, window or after cursor'}, status=400)
+    
+    if request.GET.get('around') == 'me':
+        profiles = leaderboard_around(request.profile, window)
+        next_cursor = None
+    else:
+        profiles = leaderboard_page(after, limit)
+        last = profiles[-1] if len(profiles) == limit else None
+        next_cursor = f'{last.total_xp}:{last.id}' if last else None
+    
+    entries = [leaderboard_entry(profile, request.user) for profile in profiles]
+    return StreamingHttpResponse(
+        stream_leaderboard(entries, next_cursor),
+        content_type='application/json',
+    )
+
 @login_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=user_etag, last_modified_func=user_last_modified)
+def api_weekly_progress(request):
+    """Completed quests per category for the last ?weeks=N ISO weeks, for charts"""
+    try:
+        weeks = int(request.GET.get('weeks', 12))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid weeks'}, status=400)
+    if not 1 <= weeks <= 104:
+        return JsonResponse({'error': 'Invalid weeks'}, status=400)
+    
+    history = []
+    for week, categories in weekly_history(request.user, weeks):
+        year, number, _ = week.isocalendar()
+        history.append({
+            'week_start': week.isoformat(),
+            'year': year,
+            'week': number,
+            'categories': categories,
+            'total': sum(categories.values()),
+        })
+    return JsonResponse({'weeks': history, 'target': WEEKLY_TARGET})
+
+@staff_member_required
+@require_GET
+def api_instrumentation(request):
+    """Per-view query counts, DB time and latency from QueryInstrumentationMiddleware"""
+    samples = collected_samples()
+    return JsonResponse({'samples': len(samples), 'views': build_report(samples)})
+
+@login_required
+@replica_view
 def profile(request):
-    profile = request.user.userprofile
+    profile = request.profile
     achievements = UserAchievement.objects.filter(user=request.user).select_related('achievement')
     
-    # Get quest completion stats
-    total_quests = UserQuest.objects.filter(user=request.user).count()
-    completed_quests = UserQuest.objects.filter(user=request.user, completed=True).count()
-    completion_rate = (completed_quests / total_quests * 100) if total_quests > 0 else 0
-    
-    # Get category stats
-    category_stats = UserQuest.objects.filter(
-        user=request.user, 
-        completed=True
-    ).values(
-        'quest__category__name'
-    ).annotate(
-        count=Count('id')
-    ).order_by('-count')
+    # Quest totals from the stored summary, see solo_tracker.stats
+    stats = get_user_stats(request.user)
     
     context = {
         'profile': profile,
         'achievements': achievements,
-        'total_quests': total_quests,
-        'completed_quests': completed_quests,
-        'completion_rate': completion_rate,
-        'category_stats': category_stats,
+        'total_quests': stats.total_quests,
+        'completed_quests': stats.completed_quests,
+        'completion_rate': stats.completion_rate,
+        'category_stats': stats.category_stats,
     }
     
     return render(request, 'solo_tracker/profile.html', context)
@@ -0,0 +1,188 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .leaderboard import leaderboard_xp_changed
+from .leveling import STAT_FIELDS, get_level_curve
+from .models import UserProfile, XPEvent
+from .ranking import move_hunter
+from .versions import bumped_version, user_data_changed
+
+
+# Columns an XP credit can change
+LEVEL_FIELDS = ['level', 'current_xp', 'total_xp', 'job_class', 'job_title', *STAT_FIELDS]
+
+
+def credit_xp(profile, amount):
+    """Atomically add amount XP to profile and apply any level ups.
+
+    The XP increment is a single F() UPDATE issued before anything is read, so
+    it takes the row lock on Postgres (or the write lock on SQLite) first and
+    concurrent credits queue up instead of overwriting each other. The level
+    up is then computed from the locked row and only the changed columns are
+    written. profile is updated in place and a summary of the change returned.
+    """
+    curve = get_level_curve()
+    with transaction.atomic():
+        UserProfile.objects.filter(pk=profile.pk).update(
+            current_xp=F('current_xp') + amount,
+            total_xp=F('total_xp') + amount,
+            data_version=bumped_version('data_version'),
+        )
+        locked = UserProfile.objects.select_for_update().only('pk', *LEVEL_FIELDS).get(pk=profile.pk)
+
+        old_level = locked.level
+        old_job_class = locked.job_class
+        locked.level, locked.current_xp = curve.advance(locked.level, locked.current_xp)
+        levels_gained = locked.level - old_level
+        stats_gained = curve.stats_gained(levels_gained)
+        if levels_gained:
+            for stat in STAT_FIELDS:
+                setattr(locked, stat, getattr(locked, stat) + stats_gained)
+            locked.update_job_class()
+            locked.save(update_fields=[field for field in LEVEL_FIELDS if field != 'total_xp'])
+
+        move_hunter(locked.total_xp - amount, locked.total_xp)
+        transaction.on_commit(partial(leaderboard_xp_changed, profile.user_id, locked.total_xp))
+
+    for field in LEVEL_FIELDS:
+        setattr(profile, field, getattr(locked, field))
+    # A method call, so it also reaches the instance behind request.profile
+    profile.forget_rank()
+
+    return {
+        'level_up': levels_gained > 0,
+        'old_level': old_level,
+        'new_level': locked.level,
+        'stats_gained': stats_gained,
+        'old_job_class': old_job_class,
+        'new_job_class': locked.job_class,
+        'current_xp': locked.current_xp,
+        'total_xp': locked.total_xp,
+    }
+
+
+def xp_ledger_deferred():
+    """Whether awards only append to the ledger and wait for compaction"""
+    return getattr(settings, 'XP_LEDGER_DEFERRED', False)
+
+
+def award_xp(profile, amount, source_type, source_id=None):
+    """Record an XP award in the ledger and credit it to profile.
+
+    With settings.XP_LEDGER_DEFERRED the award is a single insert and the
+    profile is left alone until compact_xp_events folds it in. The result
+    then reports the projected level and XP but never a level up, which is
+    notified at compaction. Otherwise the profile is credited immediately
+    and the event is stored already compacted.
+    """
+    deferred = xp_ledger_deferred()
+    with transaction.atomic():
+        XPEvent.objects.create(
+            user_id=profile.user_id,
+            source_type=source_type,
+            source_id=source_id,
+            amount=amount,
+            compacted=not deferred,
+        )
+        if not deferred:
+            return credit_xp(profile, amount)
+        user_data_changed([profile.user_id])
+
+    level, current_xp, total_xp = projected_totals(profile, pending_xp(profile.user_id))
+    return {
+        'level_up': False,
+        'old_level': profile.level,
+        'new_level': level,
+        'stats_gained': 0,
+        'old_job_class': profile.job_class,
+        'new_job_class': profile.job_class,
+        'current_xp': current_xp,
+        'total_xp': total_xp,
+    }
+
+
+def pending_xp(user_id):
+    """XP awarded to user_id that is not yet folded into the profile"""
+    pending = XPEvent.objects.filter(user_id=user_id, compacted=False).aggregate(total=Sum('amount'))
+    return pending['total'] or 0
+
+
+def projected_totals(profile, pending):
+    """(level, current_xp, total_xp) of profile once pending XP is folded in"""
+    level, current_xp = get_level_curve().advance(profile.level, profile.current_xp + pending)
+    return level, current_xp, profile.total_xp + pending
+
+
+def project_pending_xp(profile):
+    """Show profile as it will be once its uncompacted tail is folded in.
+
+    Only the in-memory instance changes, so it must not be saved afterwards.
+    Returns the pending amount, also stored on profile.pending_xp.
+    """
+    profile.pending_xp = pending_xp(profile.user_id)
+    if profile.pending_xp:
+        profile.level, profile.current_xp, profile.total_xp = projected_totals(profile, profile.pending_xp)
+    return profile.pending_xp
+
+
+def compact_xp_events(batch_size=1000, on_level_change=None):
+    """Fold uncompacted XP events into profile totals, oldest first.
+
+    Each batch is claimed first: read with select_for_update(skip_locked)
+    and marked compacted in the transaction that credits it, so concurrent
+    compactors never credit the same event twice. A batch of which another
+    run already claimed part is rolled back and read again. It is then
+    summed per user and credited with one credit_xp call per user.
+    on_level_change is called with (user, level_info) for every credit.
+    Returns the number of events compacted.
+    """
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                XPEvent.objects.select_for_update(skip_locked=True)
+                .filter(compacted=False)
+                .order_by('id')
+                .values_list('id', 'user_id', 'amount')[:batch_size]
+            )
+            if not batch:
+                return compacted
+
+            claimed = XPEvent.objects.filter(
+                id__in=[event_id for event_id, _, _ in batch], compacted=False,
+            ).update(compacted=True)
+            if claimed != len(batch):
+                transaction.set_rollback(True)
+                continue
+
+            totals = {}
+            for event_id, user_id, amount in batch:
+                totals[user_id] = totals.get(user_id, 0) + amount
+
+            profiles = UserProfile.objects.select_related('user').in_bulk(totals.keys(), field_name='user_id')
+            for user_id, amount in totals.items():
+                profile = profiles.get(user_id)
+                if profile is None:
+                    continue
+                level_info = credit_xp(profile, amount)
+                if on_level_change is not None:
+                    on_level_change(profile.user, level_info)
+        compacted += len(batch)
+
+
+def ledger_mismatches():
+    """Yield (user_id, ledger_total, profile_total) where compacted events
+    do not add up to the profile's total XP"""
+    ledger = dict(
+        XPEvent.objects.filter(compacted=True)
+        .values('user_id')
+        .annotate(total=Sum('amount'))
+        .values_list('user_id', 'total')
+    )
+    for user_id, total_xp in UserProfile.objects.values_list('user_id', 'total_xp').iterator():
+        ledger_total = ledger.get(user_id, 0)
+        if ledger_total != total_xp:
+            yield user_id, ledger_total, total_xp